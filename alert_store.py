@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import snapshot_store
+
+DB_PATH = os.environ.get("FALL_ALERT_DB", "alerts.db")
+PAGE_SIZE = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    address TEXT,
+    lat REAL,
+    lng REAL,
+    phone TEXT,
+    fall_duration REAL,
+    hospitals_notified INTEGER,
+    snapshot_key TEXT,
+    updated_at TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts (created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_status_created_at ON alerts (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_location ON alerts (lat, lng);
+
+CREATE TABLE IF NOT EXISTS alert_hospitals (
+    alert_id INTEGER NOT NULL REFERENCES alerts (id),
+    hospital_id TEXT NOT NULL,
+    distance_km REAL,
+    PRIMARY KEY (alert_id, hospital_id)
+);
+CREATE INDEX IF NOT EXISTS idx_alert_hospitals_hospital ON alert_hospitals (hospital_id, alert_id);
+"""
+
+ALERT_COLUMNS = ("id, created_at, status, address, lat, lng, phone, fall_duration, hospitals_notified,"
+                 " snapshot_key, updated_at, version")
+# Every insert or update takes the next version, so version works as a change cursor
+NEXT_VERSION = "(SELECT COALESCE(MAX(version), 0) + 1 FROM alerts)"
+
+
+def _row_to_alert(row):
+    return {
+        "id": row["id"],
+        "timestamp": row["created_at"],
+        "status": row["status"],
+        "location": {
+            "address": row["address"],
+            "lat": row["lat"],
+            "lng": row["lng"],
+            "phone": row["phone"],
+        },
+        "fall_duration": row["fall_duration"],
+        "hospitals_notified": row["hospitals_notified"],
+        "snapshot_key": row["snapshot_key"],
+        "updated_at": row["updated_at"],
+        "version": row["version"],
+    }
+
+
+class AlertStore:
+    """SQLite-backed alert store shared by every session and view.
+
+    Alert rows stay small: they only hold the snapshot_store key of the fall
+    snapshot, never the image itself.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(alerts)")]
+        if "snapshot_key" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN snapshot_key TEXT")
+        if "version" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN updated_at TEXT")
+            conn.execute("ALTER TABLE alerts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE alerts SET version = id, updated_at = created_at")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_version ON alerts (version)")
+
+        # Older databases kept snapshot JPEGs in a side table; move them to the snapshot store
+        has_blobs = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snapshots'").fetchone()
+        if has_blobs:
+            snapshots = snapshot_store.get_store()
+            for row in conn.execute("SELECT alert_id, jpeg FROM snapshots").fetchall():
+                key = snapshots.put_jpeg(bytes(row["jpeg"]))
+                conn.execute("UPDATE alerts SET snapshot_key = ? WHERE id = ?", (key, row["alert_id"]))
+            conn.execute("DROP TABLE snapshots")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def add_alert(self, location, fall_duration, snapshot_key, notified_hospitals, status="CRITICAL"):
+        """Insert an alert; notified_hospitals is a list of (hospital_id, distance_km)."""
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO alerts (created_at, status, address, lat, lng, phone, fall_duration,"
+                f" hospitals_notified, snapshot_key, updated_at, version)"
+                f" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {NEXT_VERSION})",
+                (created_at, status, location["address"], location["lat"], location["lng"],
+                 location["phone"], fall_duration, len(notified_hospitals), snapshot_key, created_at),
+            )
+            alert_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO alert_hospitals (alert_id, hospital_id, distance_km) VALUES (?, ?, ?)",
+                [(alert_id, hospital_id, distance_km) for hospital_id, distance_km in notified_hospitals],
+            )
+        return self.get_alert(alert_id)
+
+    def notified_hospitals(self, alert_id):
+        rows = self._connect().execute(
+            "SELECT hospital_id, distance_km FROM alert_hospitals WHERE alert_id = ?"
+            " ORDER BY distance_km", (alert_id,)).fetchall()
+        return [(row["hospital_id"], row["distance_km"]) for row in rows]
+
+    def get_alert(self, alert_id):
+        row = self._connect().execute(
+            f"SELECT {ALERT_COLUMNS} FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+        return _row_to_alert(row) if row else None
+
+    def set_status(self, alert_id, status):
+        with self._connect() as conn:
+            conn.execute(f"UPDATE alerts SET status = ?, updated_at = ?, version = {NEXT_VERSION}"
+                         " WHERE id = ?", (status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), alert_id))
+
+    def _where(self, status=None, since=None, bbox=None, hospital_id=None):
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if bbox is not None:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            clauses.append("lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?")
+            params.extend([min_lat, max_lat, min_lng, max_lng])
+        if hospital_id is not None:
+            clauses.append("id IN (SELECT alert_id FROM alert_hospitals WHERE hospital_id = ?)")
+            params.append(hospital_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def list_alerts(self, status=None, since=None, bbox=None, hospital_id=None,
+                    limit=PAGE_SIZE, offset=0):
+        """Newest-first page of alerts, without snapshot data."""
+        where, params = self._where(status, since, bbox, hospital_id)
+        rows = self._connect().execute(
+            f"SELECT {ALERT_COLUMNS} FROM alerts{where} ORDER BY created_at DESC, id DESC"
+            " LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return [_row_to_alert(row) for row in rows]
+
+    def count_alerts(self, status=None, since=None, bbox=None, hospital_id=None):
+        where, params = self._where(status, since, bbox, hospital_id)
+        return self._connect().execute(f"SELECT COUNT(*) FROM alerts{where}", params).fetchone()[0]
+
+    def current_version(self):
+        """Cursor for changes_since; moves on every insert and status change."""
+        return self._connect().execute("SELECT COALESCE(MAX(version), 0) FROM alerts").fetchone()[0]
+
+    def changes_since(self, version, hospital_id=None, limit=PAGE_SIZE):
+        """Alerts inserted or updated after the version cursor, oldest change first."""
+        where, params = self._where(hospital_id=hospital_id)
+        where = f"{where} AND version > ?" if where else " WHERE version > ?"
+        rows = self._connect().execute(
+            f"SELECT {ALERT_COLUMNS} FROM alerts{where} ORDER BY version LIMIT ?",
+            params + [version, limit]).fetchall()
+        return [_row_to_alert(row) for row in rows]
+
+    def latest_alert(self, status=None):
+        alerts = self.list_alerts(status=status, limit=1)
+        return alerts[0] if alerts else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AlertStore()
+        return _store
@@ -2,15 +2,17 @@ import os
 os.environ['OPENCV_IO_ENABLE_OPENEXR'] = '0'
 
 import streamlit as st
-import cv2
-import tempfile
 import os
-from ultralytics import YOLO
 import time
 from datetime import datetime
-import json
-import base64
-import numpy as np
+import alert_store
+import emergency
+import file_server
+import hospitals
+import jobs
+import metrics
+import snapshot_store
+import video_processor
 
 st.set_page_config(
     page_title="Fall Detection Emergency System",
@@ -18,223 +20,104 @@ st.set_page_config(
     layout="wide"
 )
 
-HOSPITALS = [
-    {
-        "name": "City General Hospital",
-        "address": "123 Medical Center Dr, Downtown",
-        "lat": 28.6139,
-        "lng": 77.2090,
-        "distance": "2.3 km",
-        "phone": "+91-11-2345-6789"
-    },
-    {
-        "name": "Emergency Care Center",
-        "address": "456 Healthcare Ave, Central District",
-        "lat": 28.6180,
-        "lng": 77.2150,
-        "distance": "3.1 km",
-        "phone": "+91-11-2345-6790"
-    },
-    {
-        "name": "Metro Medical Hospital",
-        "address": "789 Wellness Blvd, Medical District",
-        "lat": 28.6100,
-        "lng": 77.2050,
-        "distance": "4.2 km",
-        "phone": "+91-11-2345-6791"
-    }
-]
-
-USER_LOCATION = {
-    "address": "45 Residential Complex, Sector 12, Ghaziabad",
-    "lat": 28.6139,
-    "lng": 77.2090,
-    "phone": "+91-98765-43210"
-}
-
-if 'processed_video_path' not in st.session_state:
-    st.session_state.processed_video_path = None
-if 'processed_video_name' not in st.session_state:
-    st.session_state.processed_video_name = None
-if 'processing_complete' not in st.session_state:
-    st.session_state.processing_complete = False
-if 'emergency_alerts' not in st.session_state:
-    st.session_state.emergency_alerts = []
-if 'fall_snapshot' not in st.session_state:
-    st.session_state.fall_snapshot = None
-if 'alert_sent' not in st.session_state:
-    st.session_state.alert_sent = False
-if 'video_processed' not in st.session_state:
-    st.session_state.video_processed = False
-
-def save_fall_snapshot(frame):
-    if frame is None or frame.size == 0:
-        return None
+if metrics.METRICS_PORT:
+    metrics.start_http_server(metrics.METRICS_PORT)
+
+# Start the worker pool with the app, so its workers load and warm up the model before the first upload
+jobs.get_runner()
+
+BATCH_SIZE = video_processor.BATCH_SIZE
+USER_LOCATION = emergency.USER_LOCATION
+JOB_POLL_SECONDS = 1.0
+LIVE_POLL_SECONDS = 0.5
+
+if 'alert_page' not in st.session_state:
+    st.session_state.alert_page = 1
+if 'job_ids' not in st.session_state:
+    # Job ids live in the URL too, so a page reload picks the same jobs back up
+    st.session_state.job_ids = st.experimental_get_query_params().get("job", [])
+
 
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    success, buffer = cv2.imencode('.jpg', frame_rgb, [cv2.IMWRITE_JPEG_QUALITY, 95])
-    if not success:
+def load_snapshot(alert, thumbnail=False):
+    if not alert.get('snapshot_key'):
         return None
+    return snapshot_store.get_store().load_image(alert['snapshot_key'], thumbnail=thumbnail)
 
-    return base64.b64encode(buffer).decode('utf-8')
-
-
-def create_emergency_alert(fall_duration, snapshot_base64):
-    alert = {
-        "id": len(st.session_state.emergency_alerts) + 1,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "location": USER_LOCATION,
-        "fall_duration": fall_duration,
-        "snapshot_data": snapshot_base64,
-        "status": "CRITICAL",
-        "hospitals_notified": len(HOSPITALS)
-    }
-    st.session_state.emergency_alerts.insert(0, alert)
-    return alert
-
-def detect_action(frame, model):
-    results = model(frame)
-    for result in results:
-        boxes = result.boxes.cpu().numpy()
-        for box in boxes:
-            cls_id = box.cls[0]
-            conf = box.conf[0]
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            return cls_id, conf, x1, y1, x2, y2, frame
-    return None, None, None, None, None, None, None
-
-
-def process_video(input_path, output_path, progress_bar, status_text):
-    status_text.text("Loading YOLO model...")
-    model = YOLO("best.pt")
-    model.fuse()
-    classes = ["Fall Detected", "Walking", "Sitting"]
-
-    status_text.text("Opening video file...")
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
-        status_text.text("Failed to open video file.")
-        return False
-
-    # Get video properties
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    process_width = min(640, width)
-    process_height = int((process_width / width) * height)
-    scale_x = width / process_width
-    scale_y = height / process_height
-
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-    fall_start_time = None
-    fall_frame_count = 0
-    frame_count = 0
-    skip_frames = 2
-    alert_triggered = False
-    last_detection = None
-    detection_confidence = 0
-
-    status_text.text(f"Processing video frames... ({total_frames} total)")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_count += 1
-
-        # Update progress bar
-        if frame_count % 10 == 0:
-            progress = frame_count / total_frames
-            progress_bar.progress(progress)
-            status_text.text(f"Processing frame {frame_count}/{total_frames}")
-
-        if frame_count % skip_frames == 0:
-            small_frame = cv2.resize(frame, (process_width, process_height))
-            cls_id, conf, x1, y1, x2, y2, _ = detect_action(small_frame, model)
-
-            if cls_id is not None:
-                x1, y1, x2, y2 = map(int, [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y])
-                last_detection = (cls_id, conf, x1, y1, x2, y2, frame.copy())
-                detection_confidence = conf
-            else:
-                detection_confidence *= 0.9
-                if detection_confidence < 0.5:
-                    last_detection = None
-
-        if last_detection and detection_confidence > 0.5:
-            cls_id, conf, x1, y1, x2, y2, _ = last_detection
-            label = classes[int(cls_id)]
-
-            if label == "Fall Detected":
-                if fall_start_time is None:
-                    fall_start_time = frame_count / fps
-                    fall_frame_count = 0
-                else:
-                    fall_frame_count += 1
-                    elapsed_seconds = fall_frame_count / fps
-
-                    if elapsed_seconds >= 10 and not alert_triggered:
-                        snapshot_frame = frame.copy()
-                        cv2.rectangle(snapshot_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-                        cv2.putText(snapshot_frame, "FALL DETECTED!", (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-
-                        snapshot_data = save_fall_snapshot(snapshot_frame)
-                        if snapshot_data:
-                            st.session_state.fall_snapshot = snapshot_data
-                            create_emergency_alert(elapsed_seconds, snapshot_data)
-                            alert_triggered = True
-                            st.session_state.alert_sent = True
-
-                        cv2.putText(frame, "EMERGENCY ALERT SENT!", (50, 50),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-
-                    elif elapsed_seconds >= 10:
-                        cv2.putText(frame, f"ALERT ACTIVE - Fall: {int(elapsed_seconds)}s",
-                                    (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                    else:
-                        remaining = int(10 - elapsed_seconds)
-                        cv2.putText(frame, f"Fall detected, alert in {remaining}s",
-                                    (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                    
-                    # Draw bbox - YELLOW for <10s, RED for >=10s
-                    if elapsed_seconds >= 10:
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)  # RED
-                        cv2.putText(frame, label, (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                    else:
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 3)  # YELLOW
-                        cv2.putText(frame, label, (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            else:
-                fall_start_time = None
-                fall_frame_count = 0
-                alert_triggered = False
-                # GREEN bbox for Walking/Sitting
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, label, (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-        out.write(frame)
+def _set_job_ids(job_ids):
+    st.session_state.job_ids = job_ids
+    st.experimental_set_query_params(job=job_ids)
 
-    cap.release()
-    out.release()
-    status_text.text("Processing completed successfully!")
-    return True
+
+def show_job(runner, job):
+    st.markdown(f"**{job['input_name']}** - {job['status']}")
+
+    if job["status"] in jobs.ACTIVE:
+        fraction = job["frames_done"] / job["frames_total"] if job["frames_total"] else 0.0
+        st.progress(min(fraction, 1.0))
+        if job["status"] == "queued":
+            st.caption("Waiting for a free worker...")
+        else:
+            st.caption(f"Processing frame {job['frames_done']}/{job['frames_total']}")
+        if job["alerts"]:
+            st.error("EMERGENCY DETECTED! Check Family Dashboard to see alert details!")
+        return
+
+    if job["status"] == "failed":
+        st.error(f"Processing failed: {job['error']}")
+    else:
+        stats = job["stats"]
+        busiest = max(stats["stages"], key=lambda name: stats["stages"][name]["busy_seconds"])
+        summary = f"slowest stage: {busiest}, frames analysed: {stats['frames_analysed']}/{stats['frames']}"
+        if stats.get("cached_detections"):
+            summary += ", detections replayed from cache"
+        if "scheduler" in stats:
+            summary += f", model calls saved by motion gating: {stats['scheduler']['inferences_saved']}"
+        if "model_registry" in stats:
+            model_stats = stats["model_registry"]
+            summary += (f", model load: {model_stats['last_job_load_seconds']:.2f}s"
+                        f" ({'cache hit' if model_stats['cache_hit'] else 'loaded from disk'})")
+        st.success(f"Processing completed successfully! ({summary})")
+        if job["alerts"]:
+            st.error("EMERGENCY DETECTED! Check Family Dashboard to see alert details!")
+
+        with st.expander("Pipeline metrics"):
+            st.json(stats)
+
+        output_url = file_server.file_url(job["output_path"])
+        if os.path.exists(job["output_path"]) and output_url:
+            # Served by file_server in chunks rather than read into the session
+            st.link_button("Download Processed Video", output_url)
+        elif os.path.exists(job["output_path"]):
+            with open(job["output_path"], 'rb') as file:
+                st.download_button(
+                    label="Download Processed Video",
+                    data=file,
+                    file_name=os.path.basename(job["output_path"]),
+                    mime="video/x-msvideo",
+                    key=f"download-{job['id']}"
+                )
+
+    if st.button("Remove", key=f"remove-{job['id']}"):
+        runner.store.delete(job["id"])
+        _set_job_ids([job_id for job_id in st.session_state.job_ids if job_id != job["id"]])
+        st.rerun()
 
 
 def user_upload_view():
     st.title("User - Upload Video for Fall Detection")
+    runner = jobs.get_runner()
+    file_server.start(runner)
     
     st.subheader("Upload Video File")
     video_file = st.file_uploader("Choose video file", type=['mp4', 'avi', 'mov', 'mkv'])
     
     if video_file is not None:
+        # Stage each upload to disk once, so reruns don't copy it again
+        staged = st.session_state.setdefault("staged_uploads", {})
+        if video_file.file_id not in staged:
+            staged[video_file.file_id] = jobs.stage_upload(video_file, video_file.name)
+        job_id, input_path = staged[video_file.file_id]
         st.write("Video uploaded successfully!")
         
         st.markdown("""
@@ -246,208 +129,249 @@ def user_upload_view():
             }
             </style>
         """, unsafe_allow_html=True)
-        st.video(video_file)
+        st.video(file_server.file_url(input_path) or input_path)
+
+        with st.expander("Alert settings"):
+            alert_settings = {
+                "alert_seconds": st.number_input("Seconds on the ground before alerting", 1, 120,
+                                                 video_processor.ALERT_SECONDS),
+                "confidence_threshold": st.slider("Detection confidence threshold", 0.1, 0.9,
+                                                  video_processor.CONFIDENCE_THRESHOLD, 0.05),
+                "confidence_decay": st.slider("Confidence decay per missed frame", 0.5, 0.99,
+                                              video_processor.CONFIDENCE_DECAY, 0.01),
+            }
+            st.caption("Re-processing the same video with a new alert time or decay reuses its cached detections.")
         
-        if st.button("Process Video with Fall Detection") and not st.session_state.video_processed:
-            st.session_state.video_processed = True
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_video:
-                video_file.seek(0)
-                tmp_video.write(video_file.read())
-                video_path = tmp_video.name
-            
-            output_filename = f"processed_{video_file.name.rsplit('.', 1)[0]}.avi"
-            output_path = os.path.join(tempfile.gettempdir(), output_filename)
-            
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            with st.spinner('Processing video... Monitoring for falls...'):
-                success = process_video(video_path, output_path, progress_bar, status_text)
-            
-            if success:
-                st.session_state.processed_video_path = output_path
-                st.session_state.processed_video_name = output_filename
-                st.session_state.processing_complete = True
-                
-                progress_bar.progress(1.0)
-                status_text.success("Processing completed!")
-                
-                if st.session_state.alert_sent:
-                    st.balloons()
-                    st.error("EMERGENCY DETECTED! Check Family Dashboard to see alert details!")
-            
-            try:
-                os.unlink(video_path)
-            except:
-                pass
+        if st.button("Process Video with Fall Detection"):
+            runner.submit(job_id, video_file.name, input_path, {
+                "batch_size": BATCH_SIZE,
+                "alert_settings": alert_settings,
+            })
+            # The staged file now belongs to the job; submitting again stages a fresh copy
+            del staged[video_file.file_id]
+            _set_job_ids(st.session_state.job_ids + [job_id])
     else:
         st.info("Please upload a video file to begin monitoring.")
-    
-    if st.session_state.processing_complete and st.session_state.processed_video_path:
-        if os.path.exists(st.session_state.processed_video_path):
-            st.success("Video processing completed!")
-            
-            with open(st.session_state.processed_video_path, 'rb') as file:
-                st.download_button(
-                    label="Download Processed Video",
-                    data=file.read(),
-                    file_name=st.session_state.processed_video_name,
-                    mime="video/mp4"
-                )
-            
-            if st.button("Process Another Video"):
-                try:
-                    os.unlink(st.session_state.processed_video_path)
-                except:
-                    pass
-                st.session_state.processing_complete = False
-                st.session_state.processed_video_path = None
-                st.session_state.processed_video_name = None
-                st.session_state.alert_sent = False
-                st.session_state.video_processed = False
-                st.rerun()
+
+    job_list = [job for job in map(runner.store.get, st.session_state.job_ids) if job]
+    if job_list:
+        st.subheader("Your Jobs")
+    for job in job_list:
+        with st.container():
+            show_job(runner, job)
+            st.markdown("---")
+
+    if any(job["status"] in jobs.ACTIVE for job in job_list):
+        runner.ensure_workers()
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+def watch_alerts(cursor, on_change, hospital_id=None):
+    """Check the alert store's version cursor once, then rerun the script to check again.
+
+    After LIVE_POLL_SECONDS a cheap MAX(version) query tells whether anything
+    changed since cursor; if so on_change(changed_alerts) renders it right
+    away. The script then ends with a rerun instead of looping, so a session
+    never holds its script thread for longer than one poll and widget
+    interaction does not have to interrupt it.
+    """
+    store = alert_store.get_store()
+    status = st.empty()
+    time.sleep(LIVE_POLL_SECONDS)
+    version = store.current_version()
+    if version != cursor:
+        changed = store.changes_since(cursor, hospital_id=hospital_id)
+        if changed:
+            on_change(changed)
+    status.caption(f"Live - checked {datetime.now().strftime('%H:%M:%S')}")
+    st.rerun()
+
+
+def render_family_alert(latest_alert):
+    st.error(f"EMERGENCY ALERT ACTIVE - Alert sent at {latest_alert['timestamp']}")
+
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### Patient Information")
+        st.write(f"**Location:** {USER_LOCATION['address']}")
+        st.write(f"**Contact:** {USER_LOCATION['phone']}")
+        st.write(f"**Fall Duration:** {latest_alert['fall_duration']:.1f} seconds")
+        st.write(f"**Alert Time:** {latest_alert['timestamp']}")
+
+        st.markdown("### Fall Detection Image")
+        try:
+            img = load_snapshot(latest_alert)
+            if img is not None:
+                st.image(img, caption="Fall Detection Snapshot", use_column_width=True)
+        except:
+            st.info("Image loading...")
+
+    with col2:
+        st.markdown("### Hospitals Notified")
+        notified = alert_store.get_store().notified_hospitals(latest_alert['id'])
+        st.success(f"Alert sent to {len(notified)} nearby hospitals")
+
+        index = hospitals.get_index()
+        for idx, (hospital_id, distance_km) in enumerate(notified, 1):
+            hospital = index.by_id.get(hospital_id)
+            if hospital is None:
+                continue
+            with st.container():
+                st.markdown(f"**{idx}. {hospital['name']}**")
+                st.write(f"Address: {hospital['address']}")
+                st.write(f"Phone: {hospital['phone']}")
+                st.write(f"Distance: {hospitals.format_distance(distance_km)}")
+                st.markdown("---")
+
+        st.info("Whichever hospital responds first will send help!")
+
 
 def family_dashboard():
     st.title("Family Dashboard - Emergency Monitoring")
-    
-    if st.session_state.alert_sent and st.session_state.emergency_alerts:
-        latest_alert = st.session_state.emergency_alerts[0]
-        st.error(f"EMERGENCY ALERT ACTIVE - Alert sent at {latest_alert['timestamp']}")
-        
-        st.markdown("---")
-        
-        col1, col2 = st.columns(2)
-        
+
+    store = alert_store.get_store()
+    cursor = store.current_version()
+    body = st.empty()
+    shown = {}
+
+    def refresh(changed=None):
+        latest_alert = store.latest_alert(status="CRITICAL")
+        key = (latest_alert['id'], latest_alert['version']) if latest_alert else None
+        if shown and shown["key"] == key:
+            return
+        shown["key"] = key
+        with body.container():
+            if latest_alert:
+                render_family_alert(latest_alert)
+            else:
+                st.success("No emergency alerts. System monitoring...")
+                st.info("When a fall is detected for more than 10 seconds, an alert will be sent to nearby hospitals automatically.")
+
+    refresh()
+    watch_alerts(cursor, refresh)
+
+
+def render_hospital_alert(alert, hospital_info, index):
+    with st.expander(f"ALERT #{alert['id']} - {alert['timestamp']} - {alert['status']}", expanded=True):
+
+        col1, col2 = st.columns([2, 1])
+
         with col1:
-            st.markdown("### Patient Information")
-            st.write(f"**Location:** {USER_LOCATION['address']}")
-            st.write(f"**Contact:** {USER_LOCATION['phone']}")
-            st.write(f"**Fall Duration:** {latest_alert['fall_duration']:.1f} seconds")
-            st.write(f"**Alert Time:** {latest_alert['timestamp']}")
-            
-            st.markdown("### Fall Detection Image")
-            snapshot_data = latest_alert.get('snapshot_data')
-            if snapshot_data:
-                try:
-                    img_bytes = base64.b64decode(snapshot_data)
-                    img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-                    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                    if img is not None:
-                        st.image(img, caption="Fall Detection Snapshot", use_column_width=True)
-                except:
-                    st.info("Image loading...")
-        
+            st.markdown("### Patient Emergency Details")
+            st.write(f"**Address:** {alert['location']['address']}")
+            st.write(f"**Contact:** {alert['location']['phone']}")
+            st.write(f"**Coordinates:** {alert['location']['lat']}, {alert['location']['lng']}")
+            st.write(f"**Fall Duration:** {alert['fall_duration']:.1f} seconds")
+            st.write(f"**Alert Time:** {alert['timestamp']}")
+
+            distance_km = index.distance_km(hospital_info, alert['location']['lat'], alert['location']['lng'])
+            st.write(f"**Distance from your hospital:** {hospitals.format_distance(distance_km)}")
+
+            maps_url = f"https://www.google.com/maps/dir/?api=1&origin={hospital_info['lat']},{hospital_info['lng']}&destination={alert['location']['lat']},{alert['location']['lng']}"
+
+            st.markdown(f"""
+                <a href="{maps_url}" target="_blank">
+                    <button style="
+                        background-color: #FF4B4B;
+                        color: white;
+                        padding: 15px 32px;
+                        font-size: 18px;
+                        border: none;
+                        border-radius: 8px;
+                        cursor: pointer;
+                        margin: 10px 0;
+                    ">
+                        GET DIRECTIONS & DISPATCH AMBULANCE
+                    </button>
+                </a>
+            """, unsafe_allow_html=True)
+
         with col2:
-            st.markdown("### Hospitals Notified")
-            st.success(f"Alert sent to {len(HOSPITALS)} nearby hospitals")
-            
-            for idx, hospital in enumerate(HOSPITALS, 1):
-                with st.container():
-                    st.markdown(f"**{idx}. {hospital['name']}**")
-                    st.write(f"Address: {hospital['address']}")
-                    st.write(f"Phone: {hospital['phone']}")
-                    st.write(f"Distance: {hospital['distance']}")
-                    st.markdown("---")
-            
-            st.info("Whichever hospital responds first will send help!")
-    
-    else:
-        st.success("No emergency alerts. System monitoring...")
-        st.info("When a fall is detected for more than 10 seconds, an alert will be sent to nearby hospitals automatically.")
-    
-    if st.button("Refresh Dashboard"):
-        st.rerun()
+            st.markdown("### Fall Detection Image")
+            try:
+                img = load_snapshot(alert, thumbnail=True)
+                if img is not None:
+                    st.image(img, caption="Fall Detection Snapshot", width=400)
+                else:
+                    st.info("No image available")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+
+        st.markdown("---")
+        st.info("**Note:** This alert was also sent to other nearby hospitals. Whichever hospital responds first should dispatch help.")
+
 
 def hospital_view():
     st.title("Hospital Emergency Response Center")
     
+    index = hospitals.get_index()
     st.sidebar.markdown("### Logged in as:")
     selected_hospital = st.sidebar.selectbox(
         "Select Hospital",
-        [h['name'] for h in HOSPITALS],
+        list(index.by_id),
+        format_func=lambda hospital_id: index.by_id[hospital_id]['name'],
         index=0
     )
     
-    hospital_info = next(h for h in HOSPITALS if h['name'] == selected_hospital)
+    hospital_info = index.by_id[selected_hospital]
     st.sidebar.success(f"**{hospital_info['name']}**")
     st.sidebar.write(f"Address: {hospital_info['address']}")
     st.sidebar.write(f"Phone: {hospital_info['phone']}")
     
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Active Alerts", len([a for a in st.session_state.emergency_alerts if a['status'] == 'CRITICAL']))
-    with col2:
-        st.metric("Today's Alerts", len(st.session_state.emergency_alerts))
-    with col3:
-        st.metric("Avg Response", "2.3 min")
-    
+    store = alert_store.get_store()
+    cursor = store.current_version()
+    total_alerts = store.count_alerts(hospital_id=selected_hospital)
+
+    counters = st.empty()
     st.markdown("---")
-    
-    if st.session_state.emergency_alerts:
-        st.subheader("Emergency Alerts")
-        
-        for alert in st.session_state.emergency_alerts:
-            with st.expander(f"ALERT #{alert['id']} - {alert['timestamp']} - {alert['status']}", expanded=True):
-                
-                col1, col2 = st.columns([2, 1])
-                
-                with col1:
-                    st.markdown("### Patient Emergency Details")
-                    st.write(f"**Address:** {alert['location']['address']}")
-                    st.write(f"**Contact:** {alert['location']['phone']}")
-                    st.write(f"**Coordinates:** {alert['location']['lat']}, {alert['location']['lng']}")
-                    st.write(f"**Fall Duration:** {alert['fall_duration']:.1f} seconds")
-                    st.write(f"**Alert Time:** {alert['timestamp']}")
-                    
-                    st.write(f"**Distance from your hospital:** {hospital_info['distance']}")
-                    
-                    maps_url = f"https://www.google.com/maps/dir/?api=1&origin={hospital_info['lat']},{hospital_info['lng']}&destination={alert['location']['lat']},{alert['location']['lng']}"
-                    
-                    st.markdown(f"""
-                        <a href="{maps_url}" target="_blank">
-                            <button style="
-                                background-color: #FF4B4B;
-                                color: white;
-                                padding: 15px 32px;
-                                font-size: 18px;
-                                border: none;
-                                border-radius: 8px;
-                                cursor: pointer;
-                                margin: 10px 0;
-                            ">
-                                GET DIRECTIONS & DISPATCH AMBULANCE
-                            </button>
-                        </a>
-                    """, unsafe_allow_html=True)
-                
-                with col2:
-                    st.markdown("### Fall Detection Image")
-                    snapshot_data = alert.get('snapshot_data')
-                    
-                    if snapshot_data:
-                        try:
-                            img_bytes = base64.b64decode(snapshot_data)
-                            img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-                            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                            
-                            if img is not None:
-                                st.image(img, caption="Fall Detection Snapshot", width=400)
-                            else:
-                                st.warning("Image loading...")
-                        except Exception as e:
-                            st.error(f"Error: {str(e)}")
-                    else:
-                        st.info("No image available")
-                
-                st.markdown("---")
-                st.info("**Note:** This alert was also sent to other nearby hospitals. Whichever hospital responds first should dispatch help.")
-    
-    else:
-        st.success("No active emergency alerts. System monitoring...")
-    
-    if st.button("Refresh Alerts"):
-        st.rerun()
+    st.subheader("Emergency Alerts")
+
+    page = 1
+    if total_alerts > alert_store.PAGE_SIZE:
+        page_count = (total_alerts + alert_store.PAGE_SIZE - 1) // alert_store.PAGE_SIZE
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                               value=min(st.session_state.alert_page, page_count), step=1)
+    st.session_state.alert_page = page
+
+    # A fixed window of slots; a refresh rewrites only the slots whose alert or version changed
+    empty_state = st.empty()
+    slots = [st.empty() for _ in range(alert_store.PAGE_SIZE)]
+    shown = [None] * len(slots)
+
+    def refresh(changed=None):
+        with counters.container():
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Active Alerts", store.count_alerts(status="CRITICAL", hospital_id=selected_hospital))
+            with col2:
+                st.metric("Today's Alerts", store.count_alerts(since=datetime.now().strftime("%Y-%m-%d"),
+                                                               hospital_id=selected_hospital))
+            with col3:
+                st.metric("Avg Response", "2.3 min")
+
+        alerts = store.list_alerts(hospital_id=selected_hospital, limit=len(slots),
+                                   offset=(page - 1) * alert_store.PAGE_SIZE)
+        if alerts:
+            empty_state.empty()
+        else:
+            empty_state.success("No active emergency alerts. System monitoring...")
+        for idx, slot in enumerate(slots):
+            alert = alerts[idx] if idx < len(alerts) else None
+            key = (alert['id'], alert['version']) if alert else None
+            if key == shown[idx]:
+                continue
+            shown[idx] = key
+            if alert is None:
+                slot.empty()
+            else:
+                with slot.container():
+                    render_hospital_alert(alert, hospital_info, index)
+
+    refresh()
+    watch_alerts(cursor, refresh, hospital_id=selected_hospital)
 
 def main():
     st.sidebar.title("Select View")
@@ -458,8 +382,13 @@ def main():
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("### System Status")
-    st.sidebar.info(f"Active Alerts: {len(st.session_state.emergency_alerts)}")
-    st.sidebar.info(f"Hospitals: {len(HOSPITALS)}")
+    st.sidebar.info(f"Active Alerts: {alert_store.get_store().count_alerts(status='CRITICAL')}")
+    st.sidebar.info(f"Hospitals: {len(hospitals.get_index())}")
+
+    runner = jobs.get_runner()
+    st.sidebar.markdown("### Processing Queue")
+    st.sidebar.info(f"Running: {runner.store.count('running')} / {runner.workers} workers, "
+                    f"queued: {runner.store.count('queued')}")
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("### About System")
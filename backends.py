@@ -0,0 +1,304 @@
+"""CPU inference backends for the fall detector: ONNX Runtime and OpenVINO.
+
+    python backends.py export --weights best.pt
+    python backends.py quantize --onnx best.onnx --videos clips/*.mp4
+    python backends.py parity --weights best.pt --backend onnx --model best.int8.onnx --videos clips/*.mp4
+
+Backends expose detect_batch(frames), returning the same (N, 6) x1, y1, x2, y2,
+conf, cls arrays as detection.detect_all. detection.py and model_registry.py
+use them in place of the PyTorch model. onnxruntime and openvino are optional
+dependencies that are only imported when a backend is used.
+"""
+import abc
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from letterbox import IMGSZ, letterbox
+
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+CALIBRATION_SAMPLES = 100
+
+
+def preprocess(frames, imgsz=IMGSZ):
+    boxed, metas = [], []
+    for frame in frames:
+        image, ratio, pad = letterbox(frame, imgsz)
+        boxed.append(image)
+        metas.append((ratio, pad, frame.shape[:2]))
+    batch = np.stack(boxed)[..., ::-1].transpose(0, 3, 1, 2)  # BGR -> RGB, NHWC -> NCHW
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0, metas
+
+
+def nms(boxes, scores, iou_threshold):
+    order = scores.argsort()[::-1]
+    keep = []
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(boxes[i, 0], boxes[order[1:], 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[order[1:], 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[order[1:], 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[order[1:], 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[order[1:]] - inter, 1e-6)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def postprocess(output, metas, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD):
+    """Turn raw (N, 4 + classes, anchors) YOLO output into per-frame (N, 6) arrays."""
+    results = []
+    for prediction, (ratio, (pad_x, pad_y), (height, width)) in zip(output, metas):
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        mask = conf > conf_threshold
+        if not mask.any():
+            results.append(np.zeros((0, 6), dtype=np.float32))
+            continue
+
+        xywh, cls, conf = prediction[mask, :4], cls[mask], conf[mask]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # Class-aware NMS: shift each class to its own region, as ultralytics does
+        keep = nms(boxes + cls[:, None] * 7680.0, conf, iou_threshold)[:MAX_DETECTIONS]
+        boxes, cls, conf = boxes[keep], cls[keep], conf[keep]
+
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / ratio).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / ratio).clip(0, height)
+        results.append(np.hstack([boxes, conf[:, None], cls[:, None]]).astype(np.float32))
+    return results
+
+
+class _Backend(abc.ABC):
+    fixed_batch = False
+    fixed_size = False
+
+    def __init__(self, imgsz=IMGSZ, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD):
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    @abc.abstractmethod
+    def _infer(self, batch):
+        """Run the model on a preprocessed (N, 3, H, W) batch and return its raw output."""
+
+    def detect_batch(self, frames, imgsz=None):
+        frames = list(frames)
+        if not frames:
+            return []
+        # Models exported without dynamic axes only take their export size
+        imgsz = self.imgsz if self.fixed_size or not imgsz else imgsz
+        batch, metas = preprocess(frames, imgsz)
+        if self.fixed_batch:
+            output = np.concatenate([self._infer(batch[i:i + 1]) for i in range(len(batch))])
+        else:
+            output = self._infer(batch)
+        return postprocess(output, metas, self.conf_threshold, self.iou_threshold)
+
+
+class OnnxBackend(_Backend):
+    def __init__(self, onnx_path, threads=None, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The ONNX backend needs onnxruntime: pip install onnxruntime")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.fixed_batch = isinstance(model_input.shape[0], int)
+        self.fixed_size = isinstance(model_input.shape[2], int)
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(_Backend):
+    def __init__(self, model_path, threads=None, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import openvino as ov
+        except ImportError:
+            raise ImportError("The OpenVINO backend needs openvino: pip install openvino")
+
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        model = core.read_model(model_path)
+        shape = model.inputs[0].get_partial_shape()
+        self.fixed_batch = not shape[0].is_dynamic
+        self.fixed_size = not shape[2].is_dynamic
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def _infer(self, batch):
+        return self.compiled([batch])[self.output]
+
+
+BACKENDS = {"onnx": OnnxBackend, "openvino": OpenVinoBackend}
+
+
+def load_backend(kind, model_path, **kwargs):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown backend {kind!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[kind](model_path, **kwargs)
+
+
+def export_onnx(weights_path, imgsz=IMGSZ):
+    """Export PyTorch weights to ONNX with a dynamic batch dimension; returns the .onnx path."""
+    from ultralytics import YOLO
+    return YOLO(weights_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+
+def sample_frames(video_paths, count):
+    """Evenly spaced frames across the given videos."""
+    frames = []
+    per_video = max(1, count // max(1, len(video_paths)))
+    for path in video_paths:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(0, total - 1), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames[:count]
+
+
+def quantize_int8(onnx_path, video_paths, output_path=None, samples=CALIBRATION_SAMPLES, imgsz=IMGSZ):
+    """Static INT8 quantization calibrated on frames sampled from video_paths."""
+    try:
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                              quantize_static)
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError:
+        raise ImportError("INT8 quantization needs onnxruntime: pip install onnxruntime")
+
+    output_path = output_path or onnx_path.replace(".onnx", ".int8.onnx")
+    frames = sample_frames(video_paths, samples)
+    if not frames:
+        raise ValueError("No calibration frames could be read from the given videos")
+
+    import onnx
+    input_name = onnx.load(onnx_path, load_external_data=False).graph.input[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            return {input_name: preprocess([frame], imgsz)[0]}
+
+    prepared_path = onnx_path.replace(".onnx", ".prep.onnx")
+    quant_pre_process(onnx_path, prepared_path)
+    quantize_static(prepared_path, output_path, FrameReader(),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return output_path
+
+
+def parity_report(reference_model, backend, frames, iou_match=0.5):
+    """Compare backend detections with the PyTorch model's on the same frames."""
+    from detection import CLS, CONF, detect_all
+    from tracker import greedy_match, iou_matrix
+
+    matched = class_agree = missed = extra = 0
+    ious, conf_diffs = [], []
+    reference_seconds = backend_seconds = 0.0
+
+    for frame in frames:
+        start = time.perf_counter()
+        reference = detect_all(frame, reference_model)
+        reference_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate = backend.detect_batch([frame])[0]
+        backend_seconds += time.perf_counter() - start
+
+        if len(reference) and len(candidate):
+            iou = iou_matrix(reference[:, :4], candidate[:, :4])
+            rows, cols = greedy_match(iou, iou >= iou_match)
+        else:
+            rows = cols = np.zeros(0, dtype=int)
+        matched += len(rows)
+        missed += len(reference) - len(rows)
+        extra += len(candidate) - len(cols)
+        class_agree += int((reference[rows, CLS] == candidate[cols, CLS]).sum())
+        if len(rows):
+            ious.extend(iou[rows, cols].tolist())
+            conf_diffs.extend(np.abs(reference[rows, CONF] - candidate[cols, CONF]).tolist())
+
+    frames_count = max(1, len(frames))
+    return {
+        "frames": len(frames),
+        "matched_boxes": matched,
+        "missed_boxes": missed,
+        "extra_boxes": extra,
+        "class_agreement": class_agree / matched if matched else None,
+        "mean_box_iou": float(np.mean(ious)) if ious else None,
+        "min_box_iou": float(np.min(ious)) if ious else None,
+        "mean_conf_abs_diff": float(np.mean(conf_diffs)) if conf_diffs else None,
+        "reference_ms_per_frame": reference_seconds / frames_count * 1000,
+        "backend_ms_per_frame": backend_seconds / frames_count * 1000,
+        "speedup": reference_seconds / backend_seconds if backend_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, quantize and check CPU inference backends.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="export best.pt to ONNX")
+    export.add_argument("--weights", default="best.pt")
+    export.add_argument("--imgsz", type=int, default=IMGSZ)
+
+    quantize = commands.add_parser("quantize", help="INT8-quantize an ONNX model")
+    quantize.add_argument("--onnx", default="best.onnx")
+    quantize.add_argument("--videos", nargs="+", required=True, help="calibration videos")
+    quantize.add_argument("--samples", type=int, default=CALIBRATION_SAMPLES)
+    quantize.add_argument("--output")
+
+    parity = commands.add_parser("parity", help="compare a backend with the PyTorch model")
+    parity.add_argument("--weights", default="best.pt")
+    parity.add_argument("--backend", choices=sorted(BACKENDS), default="onnx")
+    parity.add_argument("--model", required=True, help=".onnx file or OpenVINO .xml")
+    parity.add_argument("--videos", nargs="+", required=True)
+    parity.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(export_onnx(args.weights, args.imgsz))
+    elif args.command == "quantize":
+        print(quantize_int8(args.onnx, args.videos, args.output, args.samples))
+    else:
+        import json
+
+        import model_registry
+        report = parity_report(model_registry.get_model(args.weights),
+                               load_backend(args.backend, args.model),
+                               sample_frames(args.videos, args.samples))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Headless fall detection over a directory of recorded videos.
+
+    python batch_cli.py /archive/footage /archive/processed --workers 8
+
+Annotated videos are written under OUTPUT_DIR with the same relative layout,
+and every alert plus one "video_done" record per finished video is appended to
+OUTPUT_DIR/alerts.jsonl. Re-running the same command skips videos that already
+have a "video_done" record, so an interrupted run resumes where it stopped.
+With --output-mode clips only short clips around each fall are written, and
+with --output-mode events no video at all, just a per-video .events.jsonl.
+--output-mode analysis is the fastest screening pass: only the frames sent to
+the model are decoded, nothing is drawn, and each video gets a .timeline.npz of
+its detections. It always analyses every 2nd frame, as with --fixed-skip, and
+cannot be combined with --roi or --pipelined.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import clips
+import model_registry
+import video_processor
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+EVENTS_FILE = "alerts.jsonl"
+
+_model = None
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def find_videos(input_dir):
+    videos = []
+    for root, _, files in os.walk(input_dir):
+        for name in sorted(files):
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                videos.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(videos)
+
+
+def output_path_for(output_dir, relative_path):
+    # Keep the source extension, so a.mp4 and a.avi in one folder do not share an output
+    folder, name = os.path.split(relative_path)
+    return os.path.join(output_dir, folder, f"processed_{name}.avi")
+
+
+def load_done(events_path):
+    done = set()
+    if not os.path.exists(events_path):
+        return done
+    with open(events_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if record.get("type") == "video_done":
+                done.add(record["video"])
+    return done
+
+
+def _init_worker(weights_path, backend, torch_threads):
+    global _model
+    import torch
+    torch.set_num_threads(torch_threads)
+    _model = model_registry.get_model(weights_path, backend, threads=torch_threads)
+
+
+def _process_one(input_path, output_path, options):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    partial_path = output_path[:-len(".avi")] + ".partial.avi"
+    alerts = []
+
+    def on_alert(alert):
+        alerts.append({
+            "frame_index": alert["frame_index"],
+            "track_id": alert["track_id"],
+            "fall_duration": alert["fall_duration"],
+            "box": [int(v) for v in alert["box"]],
+        })
+
+    # Clips, events and timeline files are rewritten from scratch if a run is resumed
+    output_mode = options.get("output_mode", "full")
+    full = output_mode == "full"
+    start = time.perf_counter()
+    if output_mode == "analysis":
+        stats = video_processor.analyse_video(input_path, _model, on_alert=on_alert,
+                                              batch_size=options["batch_size"])
+    else:
+        stats = video_processor.process_video(input_path, partial_path if full else output_path, _model,
+                                              on_alert=on_alert, **options)
+    if stats is None:
+        raise RuntimeError(f"could not open {input_path}")
+    if full:
+        os.replace(partial_path, output_path)
+        stats["outputs"] = [output_path]
+    if output_mode == "analysis":
+        timeline_path = output_path[:-len(".avi")] + ".timeline.npz"
+        np.savez_compressed(timeline_path, **stats.pop("timeline"))
+        del stats["alert_events"]
+        stats["outputs"] = [timeline_path]
+
+    for alert in alerts:
+        alert["time_seconds"] = alert["frame_index"] / stats["fps"] if stats["fps"] else None
+    stats["wall_seconds"] = time.perf_counter() - start
+    return alerts, stats
+
+
+def run(input_dir, output_dir, workers, weights_path, options, backend=model_registry.DEFAULT_BACKEND):
+    os.makedirs(output_dir, exist_ok=True)
+    events_path = os.path.join(output_dir, EVENTS_FILE)
+    done = load_done(events_path)
+    videos = [v for v in find_videos(input_dir) if v not in done]
+    print(f"{len(done)} videos already done, {len(videos)} to process with {workers} workers")
+    if not videos:
+        return 0
+
+    torch_threads = max(1, available_cores() // workers)
+    failures = 0
+    with open(events_path, "a") as events, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(weights_path, backend, torch_threads)) as pool:
+        futures = {
+            pool.submit(_process_one, os.path.join(input_dir, video),
+                        output_path_for(output_dir, video), options): video
+            for video in videos
+        }
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                alerts, stats = future.result()
+            except Exception as e:
+                failures += 1
+                events.write(json.dumps({"type": "video_failed", "video": video, "error": str(e)}) + "\n")
+                events.flush()
+                print(f"FAILED {video}: {e}")
+                continue
+
+            for alert in alerts:
+                events.write(json.dumps(dict(alert, type="alert", video=video)) + "\n")
+            events.write(json.dumps({"type": "video_done", "video": video, "stats": stats}) + "\n")
+            events.flush()
+            os.fsync(events.fileno())
+            print(f"done {video}: {stats['frames']} frames, {len(alerts)} alerts, "
+                  f"{stats['frames'] / stats['wall_seconds']:.1f} fps")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fall detection over a directory of videos.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=available_cores())
+    parser.add_argument("--weights", default=model_registry.DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", choices=model_registry.BACKEND_CHOICES,
+                        default=model_registry.DEFAULT_BACKEND,
+                        help="torch for .pt weights, onnx/openvino for an exported model (see backends.py)")
+    parser.add_argument("--batch-size", type=int, default=video_processor.BATCH_SIZE)
+    parser.add_argument("--pipelined", action="store_true",
+                        help="use the threaded pipeline inside each worker")
+    parser.add_argument("--fixed-skip", action="store_true",
+                        help="analyse every 2nd frame instead of motion-gated scheduling "
+                             "(always the case in analysis mode)")
+    parser.add_argument("--roi", action="store_true",
+                        help="analyse crops around tracked people, re-scanning the full frame periodically")
+    parser.add_argument("--output-mode", choices=clips.OUTPUT_MODES + ("analysis",), default="full",
+                        help="full annotated video, only clips around falls, only an events file, "
+                             "or analysis: no drawing, only analysed frames decoded, a detection timeline")
+    parser.add_argument("--pre-seconds", type=float, default=clips.PRE_SECONDS,
+                        help="seconds of video kept before a fall in clips mode")
+    parser.add_argument("--post-seconds", type=float, default=clips.POST_SECONDS,
+                        help="seconds of video kept after an alert in clips mode")
+    args = parser.parse_args()
+    analysis = args.output_mode == "analysis"
+    if analysis and args.roi:
+        parser.error("--roi is not supported with --output-mode analysis, which scans full frames")
+    if analysis and args.pipelined:
+        parser.error("--pipelined is not supported with --output-mode analysis")
+
+    options = {
+        "batch_size": args.batch_size,
+        "pipelined": args.pipelined,
+        "adaptive": not (args.fixed_skip or analysis),
+        "output_mode": args.output_mode,
+        "roi_mode": args.roi,
+        "pre_seconds": args.pre_seconds,
+        "post_seconds": args.post_seconds,
+    }
+    failures = run(args.input_dir, args.output_dir, max(1, args.workers), args.weights, options, args.backend)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Alert latency versus compute trade-off for the video_processor settings.
+
+    python -m benchmarks.alert_tradeoff clips/ --weights best.pt
+    python -m benchmarks.alert_tradeoff clips/ --widths 320,640 --skips 1,2,4 \\
+        --thresholds 0.4,0.5,0.6 --decays 0.8,0.9 --output tradeoff.json
+
+Every clip needs a sidecar <clip>.falls.json listing its fall onset times
+in seconds ([] for a clip without a fall). Each clip goes through the model
+once per process_width, at skip_frames=1, and those per-frame detections are
+stored in detection_cache. A skip_frames=k run analyses exactly the frames
+whose index is a multiple of k. Every skip, threshold and decay is therefore
+replayed from the cached detections (video_processor.replay_alerts), and
+re-running a sweep costs no inference.
+
+Compute per setting is derived from the full-rate run's measured costs:
+- model calls are analysed frames / batch_size;
+- CPU seconds are grab time for every frame, plus decode, resize and
+  inference time for each analysed frame.
+Workers run torch with one thread, so these wall times track CPU time. The
+model input size follows process_width, so the mean inference time per
+analysed frame, printed and saved per width, should drop with the width.
+
+An alert matches the first unmatched fall whose onset is at most
+--match-seconds earlier. A further alert for an already matched fall is a
+duplicate; one that matches no fall is a false alert. The report marks the
+Pareto-optimal settings, minimising missed falls, false alerts, mean time to
+alert and CPU seconds per video minute.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import detection_cache
+import model_registry
+import video_processor
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+WIDTHS = (320, 480, 640)
+SKIPS = (1, 2, 3, 4, 6)
+THRESHOLDS = (0.3, 0.4, 0.5, 0.6, 0.7)
+DECAYS = (0.8, 0.9, 0.95)
+MATCH_SLACK_SECONDS = 20
+FULL_RATE = {"adaptive": False, "skip_frames": 1}
+TIMELINE_COLUMNS = ("frame_index", "cls", "conf", "box", "track_id")
+
+_model_args = None
+_model = None
+
+
+def labels_path(clip_path):
+    return os.path.splitext(clip_path)[0] + ".falls.json"
+
+
+def load_labels(clip_path):
+    with open(labels_path(clip_path)) as f:
+        labels = json.load(f)
+    return sorted(labels["falls"] if isinstance(labels, dict) else labels)
+
+
+def subsample(arrays, skip):
+    """Timeline arrays as a skip_frames=skip run would have produced them."""
+    rows = arrays["frame_index"] % skip == 0
+    sampled = {name: arrays[name][rows] for name in TIMELINE_COLUMNS}
+    sampled["analysed_frames"] = arrays["analysed_frames"][arrays["analysed_frames"] % skip == 0]
+    return sampled
+
+
+def score(alert_times, onsets, match_seconds):
+    matched = {}
+    false_alerts = duplicates = 0
+    for alert_time in sorted(alert_times):
+        candidates = [i for i, onset in enumerate(onsets) if onset <= alert_time <= onset + match_seconds]
+        fresh = [i for i in candidates if i not in matched]
+        if fresh:
+            matched[fresh[0]] = alert_time - onsets[fresh[0]]
+        elif candidates:
+            duplicates += 1
+        else:
+            false_alerts += 1
+    return {"delays": list(matched.values()), "missed": len(onsets) - len(matched),
+            "false_alerts": false_alerts, "duplicates": duplicates}
+
+
+def _init_worker(weights_path, backend):
+    global _model_args
+    import torch
+    torch.set_num_threads(1)
+    _model_args = (weights_path, backend)
+
+
+def _get_model():
+    # Loaded on the first cache miss only, so a fully cached re-run never loads the model
+    global _model
+    if _model is None:
+        _model = model_registry.get_model(*_model_args, threads=1)
+    return _model
+
+
+def full_rate_detections(clip_path, width, model_hash, batch_size):
+    """Skip-1 timeline and per-frame costs for clip at width; returns (arrays, meta, from_cache)."""
+    cache = detection_cache.get_cache()
+    key = detection_cache.cache_key(model_registry.file_hash(clip_path), model_hash, width, FULL_RATE)
+    hit = cache.load(key)
+    if hit:
+        return hit[0], hit[1], True
+
+    stats = video_processor.analyse_video(clip_path, _get_model(), batch_size=batch_size, skip_frames=1,
+                                          process_width=width)
+    if stats is None:
+        raise ValueError(f"could not open {clip_path}")
+    timings = stats["timings"]
+    meta = {
+        "fps": stats["fps"],
+        "frames": stats["frames"],
+        "grab_seconds_per_frame": timings["grab"] / max(stats["frames"], 1),
+        "analyse_seconds_per_frame": ((timings["retrieve"] + timings["resize"] + timings["inference"])
+                                      / max(stats["frames_analysed"], 1)),
+        "inference_seconds_per_frame": timings["inference"] / max(stats["frames_analysed"], 1),
+    }
+    cache.save(key, stats["timeline"], meta)
+    return stats["timeline"], meta, False
+
+
+def evaluate_clip(clip_path, width, model_hash, grid, batch_size, alert_seconds, match_seconds):
+    """Score every (skip, threshold, decay) in grid on one clip at one width."""
+    arrays, meta, from_cache = full_rate_detections(clip_path, width, model_hash, batch_size)
+    onsets = load_labels(clip_path)
+    fps, frames = meta["fps"], meta["frames"]
+    results = []
+    for skip in grid["skips"]:
+        sampled = detection_cache.CachedDetections(subsample(arrays, skip))
+        analysed = sampled.frames_analysed
+        cpu_seconds = meta["grab_seconds_per_frame"] * frames + meta["analyse_seconds_per_frame"] * analysed
+        for threshold, decay in itertools.product(grid["thresholds"], grid["decays"]):
+            alerts = video_processor.replay_alerts(sampled, fps, frames, alert_seconds, threshold, decay)
+            results.append(dict(
+                score([alert["time_seconds"] for alert in alerts], onsets, match_seconds),
+                setting=(width, skip, threshold, decay),
+                minutes=frames / fps / 60,
+                model_calls=math.ceil(analysed / batch_size),
+                cpu_seconds=cpu_seconds,
+            ))
+    return results, from_cache, meta["inference_seconds_per_frame"]
+
+
+def pareto_front(rows, objectives):
+    """Mark rows that no other row matches or beats on every objective and beats on one."""
+    values = [[math.inf if row[name] is None else row[name] for name in objectives] for row in rows]
+    for row, mine in zip(rows, values):
+        row["pareto"] = not any(
+            all(a <= b for a, b in zip(other, mine)) and any(a < b for a, b in zip(other, mine))
+            for other in values)
+    return [row for row in rows if row["pareto"]]
+
+
+def summarise(clip_results):
+    by_setting = {}
+    for result in clip_results:
+        by_setting.setdefault(result["setting"], []).append(result)
+
+    rows = []
+    for (width, skip, threshold, decay), results in sorted(by_setting.items()):
+        minutes = sum(r["minutes"] for r in results) or 1.0
+        delays = [delay for r in results for delay in r["delays"]]
+        rows.append({
+            "process_width": width,
+            "skip_frames": skip,
+            "confidence_threshold": threshold,
+            "confidence_decay": decay,
+            "falls": sum(len(r["delays"]) + r["missed"] for r in results),
+            "missed": sum(r["missed"] for r in results),
+            "false_alerts": sum(r["false_alerts"] for r in results),
+            "duplicates": sum(r["duplicates"] for r in results),
+            "mean_time_to_alert": sum(delays) / len(delays) if delays else None,
+            "max_time_to_alert": max(delays) if delays else None,
+            "model_calls_per_minute": sum(r["model_calls"] for r in results) / minutes,
+            "cpu_seconds_per_minute": sum(r["cpu_seconds"] for r in results) / minutes,
+        })
+    pareto_front(rows, ("missed", "false_alerts", "mean_time_to_alert", "cpu_seconds_per_minute"))
+    return rows
+
+
+def run(clips, weights_path, backend, grid, batch_size, alert_seconds, match_seconds, workers):
+    model_hash = f"{backend}:{model_registry.file_hash(weights_path)}"
+    clip_results, cached_runs, inference_seconds = [], 0, {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(weights_path, backend)) as pool:
+        futures = {
+            pool.submit(evaluate_clip, clip, width, model_hash, grid, batch_size, alert_seconds,
+                        match_seconds): (clip, width)
+            for clip in clips for width in grid["widths"]
+        }
+        for future in as_completed(futures):
+            clip, width = futures[future]
+            results, from_cache, seconds_per_frame = future.result()
+            clip_results.extend(results)
+            cached_runs += from_cache
+            inference_seconds.setdefault(width, []).append(seconds_per_frame)
+            print(f"{os.path.basename(clip)} @ {width}px: "
+                  f"{'cached detections' if from_cache else 'ran the model'}, "
+                  f"{seconds_per_frame * 1000:.1f} ms inference per analysed frame")
+    # Should drop with width: the model runs at an input size derived from process_width
+    inference_ms = {width: 1000 * sum(values) / len(values)
+                    for width, values in sorted(inference_seconds.items())}
+    return summarise(clip_results), {"detection_runs": len(futures), "from_cache": cached_runs,
+                                     "inference_ms_per_frame": inference_ms}
+
+
+def _numbers(cast):
+    return lambda text: tuple(cast(value) for value in text.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep alert settings on labeled clips")
+    parser.add_argument("clips", help="folder of clips, each with a <clip>.falls.json sidecar")
+    parser.add_argument("--weights", default=model_registry.DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", default=model_registry.DEFAULT_BACKEND,
+                        choices=model_registry.BACKEND_CHOICES)
+    parser.add_argument("--widths", type=_numbers(int), default=WIDTHS)
+    parser.add_argument("--skips", type=_numbers(int), default=SKIPS)
+    parser.add_argument("--thresholds", type=_numbers(float), default=THRESHOLDS)
+    parser.add_argument("--decays", type=_numbers(float), default=DECAYS)
+    parser.add_argument("--alert-seconds", type=float, default=video_processor.ALERT_SECONDS)
+    parser.add_argument("--match-seconds", type=float, default=None,
+                        help="latest alert after an onset that still counts (default: alert seconds + 20)")
+    parser.add_argument("--batch-size", type=int, default=video_processor.BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="alert_tradeoff.json")
+    args = parser.parse_args()
+
+    clips = []
+    for name in sorted(os.listdir(args.clips)):
+        path = os.path.join(args.clips, name)
+        if name.lower().endswith(VIDEO_EXTENSIONS):
+            if os.path.exists(labels_path(path)):
+                clips.append(path)
+            else:
+                print(f"Skipping {name}: no {os.path.basename(labels_path(path))}")
+    if not clips:
+        parser.error(f"no labeled clips in {args.clips}")
+
+    grid = {"widths": args.widths, "skips": args.skips, "thresholds": args.thresholds, "decays": args.decays}
+    match_seconds = args.match_seconds or args.alert_seconds + MATCH_SLACK_SECONDS
+    rows, cache_stats = run(clips, args.weights, args.backend, grid, args.batch_size, args.alert_seconds,
+                            match_seconds, args.workers)
+
+    report = {"clips": len(clips), "alert_seconds": args.alert_seconds, "match_seconds": match_seconds,
+              "detections": cache_stats, "settings": rows}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\nInference per analysed frame: " + ", ".join(
+        f"{width}px {ms:.1f} ms" for width, ms in cache_stats["inference_ms_per_frame"].items()))
+    print(f"\nPareto-optimal settings ({sum(row['pareto'] for row in rows)} of {len(rows)}):")
+    print(f"{'width':>6} {'skip':>5} {'conf':>5} {'decay':>6} {'missed':>7} {'false':>6} "
+          f"{'tta s':>7} {'calls/min':>10} {'cpu s/min':>10}")
+    for row in sorted((row for row in rows if row["pareto"]), key=lambda row: row["cpu_seconds_per_minute"]):
+        tta = "-" if row["mean_time_to_alert"] is None else f"{row['mean_time_to_alert']:.1f}"
+        print(f"{row['process_width']:>6} {row['skip_frames']:>5} {row['confidence_threshold']:>5} "
+              f"{row['confidence_decay']:>6} {row['missed']:>7} {row['false_alerts']:>6} {tta:>7} "
+              f"{row['model_calls_per_minute']:>10.1f} {row['cpu_seconds_per_minute']:>10.2f}")
+    print(f"Full report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
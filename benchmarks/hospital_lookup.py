@@ -0,0 +1,72 @@
+"""Nearest-hospital query time against facility count.
+
+    python -m benchmarks.hospital_lookup --counts 100 1000 10000 100000
+    python -m benchmarks.hospital_lookup --spans 3 20
+
+Facilities are scattered uniformly over a square of each --spans degrees
+(3 degrees is ~300 x 300 km; 20 degrees is well past the MAX_RINGS radius
+of the index). For each span and count the grid index is compared against a
+brute-force haversine scan, and every grid answer is checked against the
+brute-force one.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hospitals import HospitalIndex, haversine_km
+
+CENTER = (28.6139, 77.2090)
+SPANS = (3.0, 20.0)
+
+
+def make_hospitals(count, span, rng):
+    lat = CENTER[0] + rng.uniform(-span / 2, span / 2, count)
+    lng = CENTER[1] + rng.uniform(-span / 2, span / 2, count)
+    return [{"id": str(i), "name": f"Hospital {i}", "lat": float(lat[i]), "lng": float(lng[i])}
+            for i in range(count)]
+
+
+def run(counts, queries, k, spans=SPANS, seed=0):
+    rng = np.random.default_rng(seed)
+    print(f"{'span deg':>8} {'facilities':>10} {'build ms':>9} {'grid us/query':>14} "
+          f"{'brute us/query':>15}")
+    for span, count in ((span, count) for span in spans for count in counts):
+        facilities = make_hospitals(count, span, rng)
+        start = time.perf_counter()
+        index = HospitalIndex(facilities)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        points = np.column_stack([
+            CENTER[0] + rng.uniform(-span / 2, span / 2, queries),
+            CENTER[1] + rng.uniform(-span / 2, span / 2, queries),
+        ])
+
+        start = time.perf_counter()
+        grid_answers = [index.nearest(lat, lng, k) for lat, lng in points]
+        grid_us = (time.perf_counter() - start) / queries * 1e6
+
+        start = time.perf_counter()
+        brute_answers = [np.argsort(haversine_km(lat, lng, index.lat, index.lng))[:k] for lat, lng in points]
+        brute_us = (time.perf_counter() - start) / queries * 1e6
+
+        for grid, brute in zip(grid_answers, brute_answers):
+            grid_ids = [hospital["id"] for hospital, _ in grid]
+            assert grid_ids == [facilities[i]["id"] for i in brute], "grid index disagrees with brute force"
+
+        print(f"{span:>8g} {count:>10} {build_ms:>9.1f} {grid_us:>14.1f} {brute_us:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--spans", type=float, nargs="+", default=list(SPANS),
+                        help="side of the square the facilities are spread over, in degrees")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+    run(args.counts, args.queries, args.k, args.spans)
+
+
+if __name__ == "__main__":
+    main()
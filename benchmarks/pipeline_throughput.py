@@ -0,0 +1,222 @@
+"""End-to-end throughput benchmark for video_processor.process_video.
+
+    python -m benchmarks.pipeline_throughput                      # run and print
+    python -m benchmarks.pipeline_throughput --save baseline.json
+    python -m benchmarks.pipeline_throughput --compare baseline.json --threshold 0.1
+
+Synthetic test videos are generated locally (no network), at several
+resolutions, lengths and frame rates. Each one shows a person-sized red block
+that walks, falls and then lies still. Every case runs in a fresh subprocess
+so its peak RSS can be measured. It uses a stub model, which finds the block
+by colour thresholding, and also best.pt when that file exists (or with
+--real). --compare exits with status 1 when any case's frames/sec drops more
+than --threshold below the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from detection import CLASSES
+
+CASES = [
+    {"name": "360p-10s-30fps", "width": 640, "height": 360, "seconds": 10, "fps": 30},
+    {"name": "720p-10s-30fps", "width": 1280, "height": 720, "seconds": 10, "fps": 30},
+    {"name": "1080p-10s-30fps", "width": 1920, "height": 1080, "seconds": 10, "fps": 30},
+    {"name": "720p-60s-15fps", "width": 1280, "height": 720, "seconds": 60, "fps": 15},
+]
+MODES = ["serial", "pipelined"]
+VIDEO_DIR = os.path.join(tempfile.gettempdir(), "fall_benchmark_videos")
+
+
+def make_video(path, width, height, seconds, fps):
+    """Write a synthetic clip: walk for 30% of it, fall, then lie still."""
+    frames = int(seconds * fps)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    person_w, person_h = width // 12, height // 3
+    fall_at = int(frames * 0.3)
+
+    for i in range(frames):
+        frame = background.copy()
+        if i < fall_at:
+            x = int((width - person_w) * i / max(1, fall_at))
+            x1, y1, x2, y2 = x, height - person_h - 10, x + person_w, height - 10
+        else:
+            x = width - person_w - 10
+            x1, y1, x2, y2 = x - person_h + person_w, height - person_w - 10, x + person_w, height - 10
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 230), -1)
+        out.write(frame)
+    out.release()
+
+
+def video_for(case, video_dir):
+    os.makedirs(video_dir, exist_ok=True)
+    path = os.path.join(video_dir, f"{case['name']}.avi")
+    if not os.path.exists(path):
+        make_video(path, case["width"], case["height"], case["seconds"], case["fps"])
+    return path
+
+
+class _StubBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class _StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """Stand-in for YOLO that finds the synthetic red block; wide boxes count as falls."""
+
+    def __call__(self, frames, verbose=False, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        results = []
+        for frame in frames:
+            mask = (frame[..., 2] > 180) & (frame[..., 1] < 60)
+            ys, xs = np.nonzero(mask)
+            if len(xs):
+                xyxy = np.array([[xs.min(), ys.min(), xs.max(), ys.max()]], dtype=np.float32)
+                wide = (xs.max() - xs.min()) > (ys.max() - ys.min())
+                cls = CLASSES.index("Fall Detected" if wide else "Walking")
+                boxes = _StubBoxes(xyxy, np.array([0.9], dtype=np.float32), np.array([cls], dtype=np.float32))
+            else:
+                boxes = _StubBoxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32))
+            results.append(_StubResult(boxes))
+        return results
+
+
+def run_case(case, model_name, mode, video_dir):
+    import video_processor
+
+    if model_name == "stub":
+        model = StubModel()
+    else:
+        import model_registry
+        model = model_registry.get_model(model_name)
+
+    video_path = video_for(case, video_dir)
+    output_path = os.path.join(video_dir, f"out-{case['name']}-{mode}.avi")
+    start = time.perf_counter()
+    stats = video_processor.process_video(video_path, output_path, model, pipelined=(mode == "pipelined"))
+    wall = time.perf_counter() - start
+    os.unlink(output_path)
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {
+        "frames": stats["frames"],
+        "wall_seconds": wall,
+        "frames_per_second": stats["frames"] / wall,
+        "inference_calls": stats["inference_calls"],
+        "frames_analysed": stats["frames_analysed"],
+        "stage_seconds": stats["timings"],
+        "peak_rss_mb": peak_mb,
+    }
+
+
+def run_all(models, video_dir, cases=CASES, modes=MODES):
+    results = {}
+    for case in cases:
+        video_for(case, video_dir)
+        for model_name in models:
+            for mode in modes:
+                key = f"{case['name']}/{os.path.basename(model_name)}/{mode}"
+                worker = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.pipeline_throughput", "--worker",
+                     json.dumps({"case": case, "model": model_name, "mode": mode, "video_dir": video_dir})],
+                    capture_output=True, text=True, check=True)
+                results[key] = json.loads(worker.stdout.strip().splitlines()[-1])
+                r = results[key]
+                print(f"{key:<45} {r['frames_per_second']:8.1f} fps  peak {r['peak_rss_mb']:7.1f} MB  "
+                      + " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in r["stage_seconds"].items()))
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, base in baseline["results"].items():
+        if key not in results:
+            continue
+        current = results[key]["frames_per_second"]
+        floor = base["frames_per_second"] * (1 - threshold)
+        if current < floor:
+            regressions.append(f"{key}: {current:.1f} fps < {floor:.1f} "
+                               f"(baseline {base['frames_per_second']:.1f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fall detection video pipeline.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--real", action="store_true", help="also benchmark best.pt (default: if present)")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--video-dir", default=VIDEO_DIR)
+    parser.add_argument("--save", help="write results to this JSON baseline file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed fractional frames/sec drop before --compare fails")
+    args = parser.parse_args()
+
+    if args.worker:
+        job = json.loads(args.worker)
+        print(json.dumps(run_case(job["case"], job["model"], job["mode"], job["video_dir"])))
+        return
+
+    models = ["stub"]
+    if args.real or os.path.exists(args.weights):
+        models.append(args.weights)
+
+    results = run_all(models, args.video_dir)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print("no throughput regressions")
+
+
+if __name__ == "__main__":
+    main()
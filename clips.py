@@ -0,0 +1,140 @@
+import collections
+import os
+
+import cv2
+
+OUTPUT_MODES = ("full", "clips", "events")
+PRE_SECONDS = 5
+POST_SECONDS = 5
+MAX_BUFFER_BYTES = 256 * 1024 * 1024
+
+# Tracker states that keep a clip open; "active" (still down after the alert)
+# does not, so a clip ends post_seconds after the alert fires.
+EVENT_STATES = ("fall_start", "countdown", "alert")
+
+
+def _writer(path, fps, size):
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), fps, size)
+
+
+def clip_path(output_path, number):
+    root, _ = os.path.splitext(output_path)
+    return f"{root}_clip{number:03d}.avi"
+
+
+def events_path_for(output_path):
+    root, _ = os.path.splitext(output_path)
+    return root + ".events.jsonl"
+
+
+class FullVideoSink:
+    """Every annotated frame goes into output_path."""
+
+    def __init__(self, output_path, fps, size):
+        self.out = _writer(output_path, fps, size)
+        self.paths = [output_path]
+
+    def write(self, index, frame, in_event):
+        self.out.write(frame)
+
+    def close(self):
+        self.out.release()
+        return self.paths
+
+
+class NullSink:
+    """No video output; only the events file is written."""
+
+    def write(self, index, frame, in_event):
+        pass
+
+    def close(self):
+        return []
+
+
+class ClipSink:
+    """Writes short clips around fall events from a bounded ring buffer.
+
+    Up to pre_seconds of recent frames, and never more than max_buffer_bytes,
+    are held in memory. The first event frame opens a new clip that starts with
+    the buffered frames. The clip stays open until post_seconds after the last
+    event frame. on_clip(clip) is called with each finished clip's path and
+    frame range.
+    """
+
+    def __init__(self, output_path, fps, size, pre_seconds=PRE_SECONDS, post_seconds=POST_SECONDS,
+                 max_buffer_bytes=MAX_BUFFER_BYTES, on_clip=None):
+        self.output_path = output_path
+        self.fps = fps
+        self.size = size
+        self.pre_frames = max(0, int(round(pre_seconds * fps)))
+        self.post_frames = max(0, int(round(post_seconds * fps)))
+        self.max_buffer_bytes = max_buffer_bytes
+        self.on_clip = on_clip
+
+        self.buffer = collections.deque()
+        self.buffer_bytes = 0
+        self.peak_buffer_bytes = 0
+        self.out = None
+        self.clip = None
+        self.last_event = None
+        self.clips = []
+
+    def _remember(self, index, frame):
+        self.buffer.append((index, frame))
+        self.buffer_bytes += frame.nbytes
+        while self.buffer and (len(self.buffer) > self.pre_frames
+                               or self.buffer_bytes > self.max_buffer_bytes):
+            _, old = self.buffer.popleft()
+            self.buffer_bytes -= old.nbytes
+        self.peak_buffer_bytes = max(self.peak_buffer_bytes, self.buffer_bytes)
+
+    def _open(self, index):
+        path = clip_path(self.output_path, len(self.clips) + 1)
+        self.out = _writer(path, self.fps, self.size)
+        start = self.buffer[0][0] if self.buffer else index
+        self.clip = {"path": path, "start_frame": start, "end_frame": index}
+        for _, frame in self.buffer:
+            self.out.write(frame)
+        self.buffer.clear()
+        self.buffer_bytes = 0
+
+    def _finish(self):
+        self.out.release()
+        self.out = None
+        self.clips.append(self.clip)
+        if self.on_clip:
+            self.on_clip(self.clip)
+        self.clip = None
+
+    def write(self, index, frame, in_event):
+        if in_event:
+            self.last_event = index
+        if self.out is None:
+            if not in_event:
+                self._remember(index, frame)
+                return
+            self._open(index)
+
+        self.out.write(frame)
+        self.clip["end_frame"] = index
+        if not in_event and index - self.last_event >= self.post_frames:
+            self._finish()
+
+    def close(self):
+        if self.out is not None:
+            self._finish()
+        self.buffer.clear()
+        self.buffer_bytes = 0
+        return [clip["path"] for clip in self.clips]
+
+
+def make_sink(output_mode, output_path, fps, size, pre_seconds=PRE_SECONDS, post_seconds=POST_SECONDS,
+              max_buffer_bytes=MAX_BUFFER_BYTES, on_clip=None):
+    if output_mode == "full":
+        return FullVideoSink(output_path, fps, size)
+    if output_mode == "clips":
+        return ClipSink(output_path, fps, size, pre_seconds, post_seconds, max_buffer_bytes, on_clip)
+    if output_mode == "events":
+        return NullSink()
+    raise ValueError(f"Unknown output mode {output_mode!r}; choose from {', '.join(OUTPUT_MODES)}")
@@ -0,0 +1,374 @@
+"""Decode-once training cache for main.py.
+
+Every epoch of a plain model.train() run decodes and resizes each JPEG
+again. build() does that work once per split. It letterboxes every image to
+imgsz x imgsz into a memory-mapped images.npy, and maps the YOLO labels
+into the letterboxed frame in labels.npy plus offsets.npy. The manifest
+records each source image's and label file's size, mtime and SHA-1, so an
+edited, added or removed file invalidates the cache. CachedDetectionTrainer
+then trains from the memmap, and each dataloader worker maps the file itself.
+
+    python dataset_cache.py build data.yaml --imgsz 640 --workers 8
+    python dataset_cache.py report data.yaml --epochs 2    # epoch times with and without the cache
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from letterbox import letterbox
+
+CACHE_ROOT = os.environ.get("FALL_DATASET_CACHE", "dataset_cache")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CACHE_VERSION = 1
+BUILD_CHUNK = 64
+REPORT_SAMPLE = 200
+
+
+def list_images(image_dir):
+    paths = []
+    for root, _, names in os.walk(image_dir):
+        paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def label_path(image_path):
+    """Ultralytics' layout: .../images/.../x.jpg -> .../labels/.../x.txt"""
+    images, labels = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    head, _, tail = image_path.rpartition(images)
+    path = f"{head}{labels}{tail}" if head else image_path
+    return os.path.splitext(path)[0] + ".txt"
+
+
+def _sha1(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_labels(path):
+    """(N, 5) array of cls, x, y, w, h normalised to the source image; polygons become their box."""
+    rows = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                values = [float(v) for v in line.split()]
+                if len(values) == 5:
+                    rows.append(values)
+                elif len(values) > 5:
+                    xs, ys = values[1::2], values[2::2]
+                    x1, x2, y1, y2 = min(xs), max(xs), min(ys), max(ys)
+                    rows.append([values[0], (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+
+def letterbox_labels(labels, shape, ratio, pad, imgsz):
+    """Move normalised source-image boxes into the normalised letterboxed frame."""
+    height, width = shape
+    out = labels.copy()
+    out[:, 1] = (labels[:, 1] * width * ratio + pad[0]) / imgsz
+    out[:, 2] = (labels[:, 2] * height * ratio + pad[1]) / imgsz
+    out[:, 3] = labels[:, 3] * width * ratio / imgsz
+    out[:, 4] = labels[:, 4] * height * ratio / imgsz
+    return out
+
+
+def cache_dir_for(image_dir, imgsz):
+    key = hashlib.sha1(os.path.abspath(image_dir).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_ROOT, f"{os.path.basename(os.path.normpath(image_dir))}-{key}-{imgsz}")
+
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(cache_dir, "manifest.json"))
+
+
+def is_fresh(cache_dir, image_dir, imgsz):
+    """True when the cache matches imgsz and every source image and label file.
+
+    Files whose size and mtime are unchanged are trusted; any others are
+    re-hashed, so touching a file does not force a rebuild; their new size
+    and mtime are written back to the manifest.
+    """
+    manifest = load_manifest(cache_dir)
+    if not manifest or manifest["version"] != CACHE_VERSION or manifest["imgsz"] != imgsz:
+        return False
+    if [entry["path"] for entry in manifest["files"]] != list_images(image_dir):
+        return False
+    touched = False
+    for entry in manifest["files"]:
+        for path, stat_field, digest in ((entry["path"], "stat", entry["sha1"]),
+                                         (label_path(entry["path"]), "label_stat", entry["label_sha1"])):
+            stat = _stat(path)
+            if stat == entry[stat_field]:
+                continue
+            if _sha1(path) != digest:
+                return False
+            # Same content, new mtime: remember it so the file is not hashed again next run
+            entry[stat_field] = stat
+            touched = True
+    if touched:
+        _write_manifest(cache_dir, manifest)
+    return True
+
+
+def _fill(images_path, paths, start, imgsz):
+    """Worker: letterbox paths into rows start.. of the memmap; returns per-image geometry and hashes."""
+    images = np.load(images_path, mmap_mode="r+")
+    results = []
+    for offset, path in enumerate(paths):
+        frame = cv2.imread(path)
+        if frame is None:
+            raise ValueError(f"could not decode {path}")
+        boxed, ratio, pad = letterbox(frame, imgsz)
+        images[start + offset] = boxed
+        results.append({"shape": frame.shape[:2], "ratio": ratio, "pad": pad, "sha1": _sha1(path)})
+    images.flush()
+    return results
+
+
+def build(image_dir, imgsz, workers=None, cache_dir=None):
+    """Decode and letterbox every image under image_dir once; returns the cache directory."""
+    cache_dir = cache_dir or cache_dir_for(image_dir, imgsz)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    paths = list_images(image_dir)
+    if not paths:
+        raise ValueError(f"no images found under {image_dir}")
+
+    images_path = os.path.join(cache_dir, "images.npy")
+    np.lib.format.open_memmap(images_path, mode="w+", dtype=np.uint8, shape=(len(paths), imgsz, imgsz, 3)).flush()
+
+    chunks = [(start, paths[start:start + BUILD_CHUNK]) for start in range(0, len(paths), BUILD_CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fill, images_path, chunk, start, imgsz) for start, chunk in chunks]
+        geometry = [item for future in futures for item in future.result()]
+
+    files, labels, offsets = [], [], [0]
+    for path, info in zip(paths, geometry):
+        labels_file = label_path(path)
+        boxes = letterbox_labels(read_labels(labels_file), info["shape"], info["ratio"], info["pad"], imgsz)
+        labels.append(boxes)
+        offsets.append(offsets[-1] + len(boxes))
+        files.append({"path": path, "stat": _stat(path), "sha1": info["sha1"],
+                      "label_stat": _stat(labels_file), "label_sha1": _sha1(labels_file),
+                      "shape": list(info["shape"])})
+    np.save(os.path.join(cache_dir, "labels.npy"), np.concatenate(labels))
+    np.save(os.path.join(cache_dir, "offsets.npy"), np.array(offsets, dtype=np.int64))
+
+    # The manifest goes last, so an interrupted build is never mistaken for a complete one
+    _write_manifest(cache_dir, {"version": CACHE_VERSION, "imgsz": imgsz,
+                                "image_dir": os.path.abspath(image_dir), "files": files})
+    return cache_dir
+
+
+def ensure(image_dir, imgsz, workers=None):
+    cache_dir = cache_dir_for(image_dir, imgsz)
+    if not is_fresh(cache_dir, image_dir, imgsz):
+        start = time.perf_counter()
+        build(image_dir, imgsz, workers, cache_dir)
+        print(f"Cached {image_dir} at {imgsz}px in {time.perf_counter() - start:.1f}s -> {cache_dir}")
+    return cache_dir
+
+
+def prepare(data_yaml, imgsz, workers=None):
+    """Build (or validate) the cache for the train and val splits in data_yaml."""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    return {split: ensure(data[split], imgsz, workers) for split in ("train", "val") if data.get(split)}
+
+
+class CachedYOLODataset(YOLODataset):
+    """YOLODataset that reads letterboxed images and labels from a build() cache.
+
+    The memmap is opened lazily in each process, so dataloader workers share
+    the OS page cache instead of pickling pixel data.
+    """
+
+    def __init__(self, *args, cache_dir, **kwargs):
+        self.cache_dir = cache_dir
+        self.manifest = load_manifest(cache_dir)
+        self._images = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def cached_images(self):
+        if self._images is None:
+            self._images = np.load(os.path.join(self.cache_dir, "images.npy"), mmap_mode="r")
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def get_img_files(self, img_path):
+        return [entry["path"] for entry in self.manifest["files"]]
+
+    def get_labels(self):
+        labels = np.load(os.path.join(self.cache_dir, "labels.npy"))
+        offsets = np.load(os.path.join(self.cache_dir, "offsets.npy"))
+        imgsz = self.manifest["imgsz"]
+        result = []
+        for idx, entry in enumerate(self.manifest["files"]):
+            rows = labels[offsets[idx]:offsets[idx + 1]]
+            result.append({
+                "im_file": entry["path"],
+                "shape": (imgsz, imgsz),
+                "cls": rows[:, :1].copy(),
+                "bboxes": rows[:, 1:5].copy(),
+                "segments": [],
+                "keypoints": None,
+                "normalized": True,
+                "bbox_format": "xywh",
+            })
+        return result
+
+    def load_image(self, i, rect_mode=True):
+        # Copy out of the memmap: augmentations write into the image in place
+        image = np.array(self.cached_images[i])
+        if self.augment:
+            # Mosaic picks its partner images from this buffer
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return image, image.shape[:2], image.shape[:2]
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer that builds CachedYOLODataset splits, creating the cache when stale."""
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        cache_dir = ensure(img_path, self.args.imgsz, self.args.workers or None)
+        stride = max(int(self.model.stride.max()) if self.model else 0, 32)
+        return CachedYOLODataset(
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=self.args,
+            rect=self.args.rect or mode == "val",
+            cache=False,
+            single_cls=self.args.single_cls or False,
+            stride=stride,
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=f"{mode}: ",
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            fraction=self.args.fraction if mode == "train" else 1.0,
+            cache_dir=cache_dir,
+        )
+
+
+def loader_timings(image_dir, imgsz, sample=REPORT_SAMPLE):
+    """Seconds per image to decode + letterbox from source versus reading the cached copy."""
+    cache_dir = ensure(image_dir, imgsz)
+    paths = list_images(image_dir)[:sample]
+
+    start = time.perf_counter()
+    for path in paths:
+        letterbox(cv2.imread(path), imgsz)
+    decode = (time.perf_counter() - start) / len(paths)
+
+    images = np.load(os.path.join(cache_dir, "images.npy"), mmap_mode="r")
+    start = time.perf_counter()
+    for idx in range(len(paths)):
+        np.array(images[idx])
+    cached = (time.perf_counter() - start) / len(paths)
+    return {"images": len(paths), "decode_letterbox_ms": decode * 1000, "cache_read_ms": cached * 1000}
+
+
+def _epoch_times(weights, trainer, **train_args):
+    times, started = [], {}
+    model = YOLO(weights)
+    model.add_callback("on_train_epoch_start", lambda t: started.update(at=time.perf_counter()))
+    model.add_callback("on_train_epoch_end", lambda t: times.append(time.perf_counter() - started["at"]))
+    model.train(trainer=trainer, **train_args)
+    return times
+
+
+def report(data_yaml, weights, imgsz, epochs, batch, workers):
+    """Train epochs with and without the cache and compare per-epoch wall time."""
+    prepare(data_yaml, imgsz, workers)
+    with open(data_yaml) as f:
+        train_dir = yaml.safe_load(f)["train"]
+    train_args = dict(data=data_yaml, epochs=epochs, imgsz=imgsz, batch=batch, workers=workers,
+                      device="cpu", val=False, plots=False, verbose=False, exist_ok=True)
+    plain = _epoch_times(weights, DetectionTrainer, name="cache_report_plain", **train_args)
+    cached = _epoch_times(weights, CachedDetectionTrainer, name="cache_report_cached", **train_args)
+    return {
+        "imgsz": imgsz,
+        "batch": batch,
+        "workers": workers,
+        "loader": loader_timings(train_dir, imgsz),
+        "plain_epoch_seconds": plain,
+        "cached_epoch_seconds": cached,
+        "speedup": (sum(plain) / sum(cached)) if cached and sum(cached) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-letterboxed training image cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="build or validate the cache for data.yaml's splits")
+    build_parser.add_argument("data")
+    build_parser.add_argument("--imgsz", type=int, default=640)
+    build_parser.add_argument("--workers", type=int, default=None)
+
+    report_parser = sub.add_parser("report", help="compare epoch times with and without the cache")
+    report_parser.add_argument("data")
+    report_parser.add_argument("--weights", default="yolo12n.pt")
+    report_parser.add_argument("--imgsz", type=int, default=640)
+    report_parser.add_argument("--epochs", type=int, default=2)
+    report_parser.add_argument("--batch", type=int, default=16)
+    report_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    report_parser.add_argument("--output", default="dataset_cache_report.json")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for split, cache_dir in prepare(args.data, args.imgsz, args.workers).items():
+            print(f"{split}: {cache_dir}")
+        return
+
+    result = report(args.data, args.weights, args.imgsz, args.epochs, args.batch, args.workers)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import numpy as np
+
+CLASSES = ["Fall Detected", "Walking", "Sitting"]
+FALL_CLASS = CLASSES.index("Fall Detected")
+
+NO_DETECTION = (None, None, None, None, None, None, None)
+
+# Column layout of the (N, 6) detection arrays: x1, y1, x2, y2, conf, cls
+CONF = 4
+CLS = 5
+
+
+def empty_detections():
+    return np.zeros((0, 6), dtype=np.float32)
+
+
+def _result_array(result):
+    boxes = result.boxes.cpu().numpy()
+    if len(boxes) == 0:
+        return empty_detections()
+    return np.hstack([
+        boxes.xyxy.reshape(-1, 4),
+        boxes.conf.reshape(-1, 1),
+        boxes.cls.reshape(-1, 1),
+    ]).astype(np.float32)
+
+
+def _first_box(detections, frame):
+    if len(detections) == 0:
+        return NO_DETECTION
+    x1, y1, x2, y2 = map(int, detections[0, :4])
+    return detections[0, CLS], detections[0, CONF], x1, y1, x2, y2, frame
+
+
+def _run(model, frames, imgsz=None):
+    # ONNX Runtime / OpenVINO backends (backends.py) return the arrays directly
+    if hasattr(model, "detect_batch"):
+        return model.detect_batch(frames, imgsz=imgsz)
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    return [_result_array(result) for result in model(frames, verbose=False, **kwargs)]
+
+
+def detect_action(frame, model):
+    return _first_box(detect_all(frame, model), frame)
+
+
+def detect_all(frame, model):
+    """Return every detection in frame as an (N, 6) array of x1, y1, x2, y2, conf, cls."""
+    for detections in _run(model, [frame]):
+        return detections
+    return empty_detections()
+
+
+def detect_all_batch(frames, model, imgsz=None):
+    """Run one forward pass over N preprocessed frames.
+
+    frames can be a stacked (N, H, W, 3) array or a list of frames. imgsz
+    overrides the model's input size for this call. Returns one
+    detect_all-style array per frame, in the same order.
+    """
+    frames = list(frames)
+    if not frames:
+        return []
+    return _run(model, frames, imgsz)
+
+
+def detect_actions_batch(frames, model):
+    frames = list(frames)
+    return [_first_box(detections, frame)
+            for frame, detections in zip(frames, detect_all_batch(frames, model))]
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from detection import empty_detections
+
+CACHE_DIR = os.environ.get("FALL_DETECTION_CACHE", "detection_cache")
+FORMAT_VERSION = 2
+
+
+def cache_key(video_hash, model_hash, process_width, sampling):
+    """Key for one video run through one model at one resolution and sampling config."""
+    payload = json.dumps({
+        "version": FORMAT_VERSION,
+        "video": video_hash,
+        "model": model_hash,
+        "process_width": process_width,
+        "sampling": sampling,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachedDetections:
+    """Per-frame detections read back from a timeline, in BatchedDetector's push/flush shape.
+
+    process_video uses it in place of a BatchedDetector to replay a cached run
+    without calling the model.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.analysed = set(arrays["analysed_frames"].tolist())
+        self.frame_index = arrays["frame_index"]
+        self.rows = np.hstack([
+            arrays["box"],
+            arrays["conf"].reshape(-1, 1),
+            arrays["cls"].reshape(-1, 1).astype(np.float32),
+        ]).astype(np.float32)
+        self.frames_analysed = len(self.analysed)
+        self.inference_calls = 0
+        self.timings = {}
+
+    def get(self, frame_index):
+        """(N, 6) detections for an analysed frame, or None if it was not analysed."""
+        if frame_index not in self.analysed:
+            return None
+        lo, hi = np.searchsorted(self.frame_index, [frame_index, frame_index + 1])
+        if lo == hi:
+            return empty_detections()
+        return self.rows[lo:hi]
+
+    def push(self, frame_count, frame):
+        return [(frame_count, frame, self.get(frame_count))]
+
+    def flush(self):
+        return []
+
+
+class DetectionCache:
+    """Timelines from video_processor stored as .npz files under root, one per cache key."""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def load(self, key):
+        """Return (timeline arrays, meta dict), or None on a miss."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+            meta = json.loads(data["meta"].item())
+        return arrays, meta
+
+    def save(self, key, arrays, meta):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DetectionCache()
+    return _cache
@@ -0,0 +1,65 @@
+import cv2
+
+import alert_store
+import hospitals
+import metrics
+import notify
+import snapshot_store
+
+USER_LOCATION = {
+    "address": "45 Residential Complex, Sector 12, Ghaziabad",
+    "lat": 28.6139,
+    "lng": 77.2090,
+    "phone": "+91-98765-43210"
+}
+
+
+def save_fall_snapshot(frame):
+    if frame is None or frame.size == 0:
+        return None
+
+    with metrics.stage_histogram("snapshot_encode").time():
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return snapshot_store.get_store().put_frame(frame_rgb, quality=95)
+
+
+def create_emergency_alert(fall_duration, snapshot_key, location=USER_LOCATION):
+    with metrics.stage_histogram("alert_create").time():
+        nearby = hospitals.get_index().nearest(location['lat'], location['lng'], k=hospitals.NEARBY_HOSPITALS)
+        notified = [(hospital['id'], distance_km) for hospital, distance_km in nearby]
+        return alert_store.get_store().add_alert(location, fall_duration, snapshot_key, notified)
+
+
+def notification_recipients(alert_id):
+    """The family contacts from the environment plus notified hospitals that list a webhook or email."""
+    recipients = []
+    if notify.FAMILY_WEBHOOK:
+        recipients.append({"id": "family", "channel": "webhook", "address": notify.FAMILY_WEBHOOK})
+    if notify.FAMILY_EMAIL:
+        recipients.append({"id": "family", "channel": "email", "address": notify.FAMILY_EMAIL})
+    index = hospitals.get_index()
+    for hospital_id, _ in alert_store.get_store().notified_hospitals(alert_id):
+        hospital = index.by_id.get(hospital_id, {})
+        for channel in ("webhook", "email"):
+            if hospital.get(channel):
+                recipients.append({"id": hospital_id, "channel": channel, "address": hospital[channel]})
+    return recipients
+
+
+def raise_alert(alert, source=None):
+    """Store a video_processor alert and hand it to the notification dispatcher.
+
+    Delivery happens in the background. source names the video or camera;
+    a repeat alert for the same person (track) of the same source during one
+    ongoing fall is stored but not sent again.
+    """
+    snapshot_key = save_fall_snapshot(alert["snapshot"])
+    if not snapshot_key:
+        return None
+    record = create_emergency_alert(alert["fall_duration"], snapshot_key)
+    recipients = notification_recipients(record["id"])
+    if recipients:
+        dedupe_key = (source, alert["track_id"]) if source is not None else None
+        notify.get_dispatcher().submit(record, recipients, dedupe_key=dedupe_key,
+                                       event_time=alert.get("time_seconds"))
+    return record
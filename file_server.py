@@ -0,0 +1,174 @@
+"""Streaming HTTP endpoints for job videos, next to the Streamlit app.
+
+    GET/HEAD /jobs/<job id>/<file>    stream a job's file (Range requests supported)
+    GET      /jobs/<job id>           job status as JSON
+    POST     /jobs?name=<file name>   upload a video as the request body; queues a job
+
+Files go out with socket.sendfile and uploads are written to disk in chunks,
+so memory use per request stays flat whatever the video size. Only files
+inside jobs.JOB_DIR are served, and job ids are random, so a URL is only
+known to whoever submitted the job.
+
+Browsers only get links here when FALL_FILE_SERVER_URL names an address they
+can reach; without it, file_url() returns None and the app streams files
+through Streamlit instead. Uploads need "Authorization: Bearer
+<FALL_UPLOAD_TOKEN>" and are refused when no token is configured or the body
+is larger than FALL_MAX_UPLOAD_MB.
+"""
+import hmac
+import json
+import mimetypes
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+import jobs
+
+FILE_SERVER_PORT = int(os.environ.get("FALL_FILE_SERVER_PORT", "8502"))
+FILE_SERVER_HOST = os.environ.get("FALL_FILE_SERVER_HOST", "127.0.0.1")
+PUBLIC_URL = os.environ.get("FALL_FILE_SERVER_URL", "").rstrip("/") or None
+UPLOAD_TOKEN = os.environ.get("FALL_UPLOAD_TOKEN")
+MAX_UPLOAD_BYTES = int(os.environ.get("FALL_MAX_UPLOAD_MB", "2048")) * 1024 * 1024
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(?:/([^/]+))?$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+mimetypes.add_type("video/x-msvideo", ".avi")
+
+
+def file_url(path):
+    """Public URL for a file inside jobs.JOB_DIR, or None without FALL_FILE_SERVER_URL."""
+    if PUBLIC_URL is None:
+        return None
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(jobs.JOB_DIR))
+    job_id, name = relative.split(os.sep)
+    return f"{PUBLIC_URL}/jobs/{job_id}/{quote(name)}"
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    store = None
+    runner = None
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self._serve_file(head=True)
+
+    def do_GET(self):
+        match = _JOB_PATH.match(urlsplit(self.path).path)
+        if match and match.group(2) is None:
+            job = self.store.get(match.group(1))
+            if job is None:
+                self.send_error(404)
+                return
+            job.pop("input_path")
+            job.pop("output_path")
+            self._send_json(200, job)
+            return
+        self._serve_file(head=False)
+
+    def _serve_file(self, head):
+        match = _JOB_PATH.match(urlsplit(self.path).path)
+        path = os.path.join(jobs.JOB_DIR, *match.groups()) if match and match.group(2) else None
+        if path is None or not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        partial = False
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = _RANGE.match(range_header.strip())
+            if not match or match.groups() == ("", ""):
+                self.send_error(416)
+                return
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                start = max(0, size - int(last))
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            partial = True
+
+        name = os.path.basename(path)
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        if name.startswith("processed_"):
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name)}")
+        self.end_headers()
+        if head:
+            return
+
+        with open(path, "rb") as f:
+            try:
+                self.connection.sendfile(f, offset=start, count=end - start + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the browser stopped reading, e.g. the user seeked in the video
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/jobs":
+            self.send_error(404)
+            return
+        if not UPLOAD_TOKEN:
+            self.send_error(403, "uploads are disabled; set FALL_UPLOAD_TOKEN")
+            return
+        if not hmac.compare_digest(self.headers.get("Authorization", "").encode(),
+                                   f"Bearer {UPLOAD_TOKEN}".encode()):
+            self.send_error(401)
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.send_error(411)
+            return
+        if not length.isdigit():
+            self.send_error(400, "bad Content-Length")
+            return
+        if int(length) > MAX_UPLOAD_BYTES:
+            self.send_error(413, f"uploads are limited to {MAX_UPLOAD_BYTES} bytes")
+            return
+        name = parse_qs(url.query).get("name", ["upload.mp4"])[0]
+        options = {"batch_size": jobs.video_processor.BATCH_SIZE}
+        try:
+            job_id = self.runner.submit_upload(self.rfile, name, options, size=int(length))
+        except EOFError:
+            self.send_error(400, "upload ended early")
+            return
+        self._send_json(201, {"job_id": job_id, "status_url": f"{PUBLIC_URL or ''}/jobs/{job_id}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start(runner, port=FILE_SERVER_PORT, host=FILE_SERVER_HOST):
+    """Serve job files for runner from a daemon thread; safe to call more than once."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            handler = type("FileHandler", (_FileHandler,), {"store": runner.store, "runner": runner})
+            _server = ThreadingHTTPServer((host, port), handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="file-server", daemon=True).start()
+        return _server
@@ -0,0 +1,175 @@
+import csv
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+HOSPITALS_FILE = os.environ.get("FALL_HOSPITALS_FILE")
+NEARBY_HOSPITALS = 3
+CELL_DEGREES = 0.1
+MAX_RINGS = 50
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_HOSPITALS = [
+    {
+        "id": "city-general",
+        "name": "City General Hospital",
+        "address": "123 Medical Center Dr, Downtown",
+        "lat": 28.6139,
+        "lng": 77.2090,
+        "phone": "+91-11-2345-6789"
+    },
+    {
+        "id": "emergency-care",
+        "name": "Emergency Care Center",
+        "address": "456 Healthcare Ave, Central District",
+        "lat": 28.6180,
+        "lng": 77.2150,
+        "phone": "+91-11-2345-6790"
+    },
+    {
+        "id": "metro-medical",
+        "name": "Metro Medical Hospital",
+        "address": "789 Wellness Blvd, Medical District",
+        "lat": 28.6100,
+        "lng": 77.2050,
+        "phone": "+91-11-2345-6791"
+    }
+]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km; any argument may be a NumPy array."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def format_distance(km):
+    return f"{km:.1f} km"
+
+
+def load_hospitals(path):
+    """Load facilities from a CSV (with name, lat, lng columns) or a JSON list."""
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            hospitals = json.load(f)
+    else:
+        with open(path, newline='') as f:
+            hospitals = list(csv.DictReader(f))
+
+    for idx, hospital in enumerate(hospitals):
+        hospital["lat"] = float(hospital["lat"])
+        hospital["lng"] = float(hospital["lng"])
+        hospital["id"] = str(hospital.get("id") or idx)
+        hospital.setdefault("address", "")
+        hospital.setdefault("phone", "")
+    return hospitals
+
+
+class HospitalIndex:
+    """Grid index over lat/lng cells for k-nearest hospital lookups.
+
+    Facilities are bucketed into cells of cell_degrees. A query scans rings of
+    cells around the query cell, nearest first, starting at the first ring
+    that can hold a facility. It stops once it has k candidates and the k-th
+    haversine distance is inside the area the scanned rings are guaranteed to
+    cover, or once every facility has been seen. Only a query that needs more
+    than MAX_RINGS rings falls back to a brute-force scan.
+    """
+
+    def __init__(self, hospitals, cell_degrees=CELL_DEGREES):
+        self.hospitals = list(hospitals)
+        self.by_id = {h["id"]: h for h in self.hospitals}
+        self.cell_degrees = cell_degrees
+        self.lat = np.array([h["lat"] for h in self.hospitals], dtype=np.float64)
+        self.lng = np.array([h["lng"] for h in self.hospitals], dtype=np.float64)
+
+        rows = np.floor(self.lat / cell_degrees).astype(int)
+        cols = np.floor(self.lng / cell_degrees).astype(int)
+        self.cells = {}
+        for idx, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            self.cells.setdefault(cell, []).append(idx)
+        self.cells = {cell: np.array(indices) for cell, indices in self.cells.items()}
+
+        if len(self.hospitals):
+            self.row_range = (rows.min(), rows.max())
+            self.col_range = (cols.min(), cols.max())
+
+    def __len__(self):
+        return len(self.hospitals)
+
+    def _ring(self, row, col, radius):
+        if radius == 0:
+            yield row, col
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def nearest(self, lat, lng, k=NEARBY_HOSPITALS):
+        """Return up to k (hospital, distance_km) pairs, nearest first."""
+        k = min(k, len(self.hospitals))
+        if k == 0:
+            return []
+
+        row = math.floor(lat / self.cell_degrees)
+        col = math.floor(lng / self.cell_degrees)
+        # Rings closer than the occupied bounding box are empty; past max_radius every cell was seen
+        min_radius = max(0, self.row_range[0] - row, row - self.row_range[1],
+                         self.col_range[0] - col, col - self.col_range[1])
+        max_radius = max(abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+                         abs(col - self.col_range[0]), abs(col - self.col_range[1]))
+
+        candidates = []
+        distances = np.zeros(0)
+        for radius in range(min_radius, max_radius + 1):
+            if radius - min_radius >= MAX_RINGS:
+                # Sparse data around this query: scanning more rings costs more than scanning everything
+                distances = haversine_km(lat, lng, self.lat, self.lng)
+                order = np.argsort(distances)[:k]
+                return [(self.hospitals[i], float(distances[i])) for i in order]
+
+            found = [self.cells[cell] for cell in self._ring(row, col, radius) if cell in self.cells]
+            if found:
+                new = np.concatenate(found)
+                candidates.append(new)
+                distances = np.concatenate(
+                    [distances, haversine_km(lat, lng, self.lat[new], self.lng[new])])
+
+            if len(distances) == len(self.hospitals):
+                break
+            if len(distances) >= k:
+                # Anything outside the scanned square is at least this far away
+                widest_lat = min(abs(lat) + (radius + 1) * self.cell_degrees, 90.0)
+                covered_km = radius * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+                kth = np.partition(distances, k - 1)[k - 1]
+                if kth <= covered_km:
+                    break
+
+        indices = np.concatenate(candidates)
+        order = np.argsort(distances)[:k]
+        return [(self.hospitals[i], float(distances[j])) for j, i in zip(order, indices[order])]
+
+    def distance_km(self, hospital, lat, lng):
+        return float(haversine_km(lat, lng, hospital["lat"], hospital["lng"]))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            hospitals = load_hospitals(HOSPITALS_FILE) if HOSPITALS_FILE else DEFAULT_HOSPITALS
+            _index = HospitalIndex(hospitals)
+        return _index
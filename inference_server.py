@@ -0,0 +1,427 @@
+"""One inference process shared by every job worker and session.
+
+Each client gets its own shared-memory ring of RING_SLOTS frame slots. A
+client writes its frames into the slots and sends only their shapes over a
+local socket, so pixel data is never pickled. The server runs the frames
+straight out of shared memory. It batches requests across clients
+round-robin: each client may contribute up to client_quantum frames to a
+batch before the next client gets a turn, and a batch holds at most
+max_batch frames. Past max_queue waiting requests, new ones are answered
+with "busy" and the client backs off and retries. A client has at most one
+request in flight, because its next request reuses the same ring slots; a
+second one is refused. So no client can hold more than one place in the
+queue, and the global max_queue is enough to bound it.
+
+Clients authenticate with a key. JobRunner generates one per server process
+and hands it to its workers; otherwise FALL_INFERENCE_AUTHKEY is used, or a
+random key. The server writes its key next to the socket as <address>.key,
+readable by its owner only, so --status can connect.
+
+RemoteModel exposes detect_batch, so detection.detect_all and friends treat
+it like any other backend and return the usual (N, 6) arrays.
+
+    python inference_server.py --weights best.pt          # run in the foreground
+    python inference_server.py --status                   # per-client stats
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from multiprocessing import connection, resource_tracker, shared_memory
+
+import numpy as np
+
+import model_registry
+from detection import detect_all_batch
+
+ENABLED = os.environ.get("FALL_INFERENCE_SERVER", "") not in ("", "0")
+ADDRESS = os.environ.get("FALL_INFERENCE_ADDRESS", os.path.join(tempfile.gettempdir(), "fall-inference.sock"))
+AUTHKEY = os.environ.get("FALL_INFERENCE_AUTHKEY", "").encode() or None
+RING_SLOTS = int(os.environ.get("FALL_INFERENCE_SLOTS", "16"))
+SLOT_BYTES = int(os.environ.get("FALL_INFERENCE_SLOT_BYTES", str(1280 * 1280 * 3)))
+MAX_BATCH = int(os.environ.get("FALL_INFERENCE_MAX_BATCH", "16"))
+CLIENT_QUANTUM = int(os.environ.get("FALL_INFERENCE_QUANTUM", "8"))
+MAX_QUEUE = int(os.environ.get("FALL_INFERENCE_MAX_QUEUE", "32"))
+BATCH_WAIT_SECONDS = 0.005
+BUSY_BACKOFF_SECONDS = 0.02
+START_TIMEOUT_SECONDS = 120
+
+
+class _Client:
+    def __init__(self, conn, client_id, slots, slot_bytes):
+        self.conn = conn
+        self.id = client_id
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.slot_bytes = slot_bytes
+        self.pending = deque()
+        self.send_lock = threading.Lock()
+        self.requests = 0
+        self.frames = 0
+        self.rejected = 0
+        self.in_flight = False
+
+    def send(self, message):
+        with self.send_lock:
+            try:
+                self.conn.send(message)
+            except OSError:
+                pass  # the client went away; its reader thread cleans up
+
+    def frame(self, slot, shape):
+        return np.ndarray(shape, np.uint8, self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        self.pending.clear()
+        self.conn.close()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a batch still in flight references the ring; the mapping goes with it
+        self.shm.unlink()
+
+
+class InferenceServer:
+    """Serves one model to many RemoteModel clients; see the module docstring."""
+
+    def __init__(self, model, address=ADDRESS, authkey=None, slots=RING_SLOTS, slot_bytes=SLOT_BYTES,
+                 max_batch=MAX_BATCH, client_quantum=CLIENT_QUANTUM, max_queue=MAX_QUEUE,
+                 batch_wait=BATCH_WAIT_SECONDS):
+        self.model = model
+        self.address = address
+        self.authkey = authkey or AUTHKEY or os.urandom(32)
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.max_batch = max_batch
+        self.client_quantum = client_quantum
+        self.max_queue = max_queue
+        self.batch_wait = batch_wait
+
+        self.clients = {}
+        self._order = deque()
+        self._queued = 0
+        self._next_client = 0
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.batch_frames = 0
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # left over from a server that did not shut down cleanly
+        write_authkey(self.address, self.authkey)
+        listener = connection.Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        threading.Thread(target=self._batch_loop, name="inference-batches", daemon=True).start()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (multiprocessing.AuthenticationError, EOFError, ConnectionError):
+                    continue  # a client with the wrong key, or one that hung up mid-handshake
+                threading.Thread(target=self._client_loop, args=(conn,), name="inference-client",
+                                 daemon=True).start()
+        finally:
+            listener.close()
+
+    def _client_loop(self, conn):
+        client = None
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "attach":
+                    with self._cond:
+                        self._next_client += 1
+                        client = _Client(conn, self._next_client, self.slots, self.slot_bytes)
+                        self.clients[client.id] = client
+                    client.send(("attached", client.shm.name, self.slots, self.slot_bytes))
+                elif message[0] == "detect":
+                    if client is None:
+                        break
+                    _, request_id, shapes, imgsz = message
+                    self._enqueue(client, request_id, shapes, imgsz)
+                elif message[0] == "stats":
+                    (client.send if client else conn.send)(("stats", self.stats()))
+        except (EOFError, OSError):
+            pass
+        finally:
+            if client is not None:
+                with self._cond:
+                    self._queued -= len(client.pending)
+                    del self.clients[client.id]
+                    if client in self._order:
+                        self._order.remove(client)
+                    client.close()
+            else:
+                conn.close()
+
+    def _enqueue(self, client, request_id, shapes, imgsz):
+        with self._cond:
+            if client.in_flight:
+                client.rejected += 1
+                client.send(("error", request_id, "a request is already in flight on this client's ring"))
+                return
+            if self._queued >= self.max_queue:
+                client.rejected += 1
+                client.send(("busy", request_id))
+                return
+            frames = [client.frame(slot, tuple(shape)) for slot, shape in enumerate(shapes)]
+            client.pending.append((request_id, frames, imgsz))
+            client.in_flight = True
+            if client not in self._order:
+                self._order.append(client)
+            self._queued += 1
+            self._cond.notify()
+
+    def _take_batch(self):
+        """Round-robin over clients, up to client_quantum frames each; one imgsz per batch."""
+        batch, size, imgsz = [], 0, None
+        for _ in range(len(self._order)):
+            client = self._order[0]
+            self._order.rotate(-1)
+            taken = 0
+            while client.pending and taken < self.client_quantum:
+                request_id, frames, request_imgsz = client.pending[0]
+                if batch and (request_imgsz != imgsz or size + len(frames) > self.max_batch):
+                    break
+                client.pending.popleft()
+                self._queued -= 1
+                imgsz = request_imgsz
+                batch.append((client, request_id, frames))
+                size += len(frames)
+                taken += len(frames)
+            if not client.pending:
+                self._order.remove(client)
+            if size >= self.max_batch:
+                break
+        return batch, imgsz
+
+    def _batch_loop(self):
+        while True:
+            with self._cond:
+                while not self._queued:
+                    self._cond.wait()
+            # Give other clients a moment to join this batch
+            time.sleep(self.batch_wait)
+            with self._cond:
+                batch, imgsz = self._take_batch()
+            frames = [frame for _, _, request_frames in batch for frame in request_frames]
+            try:
+                results = detect_all_batch(frames, self.model, imgsz)
+            except Exception as e:
+                for client, request_id, _ in batch:
+                    client.in_flight = False
+                    client.send(("error", request_id, f"{type(e).__name__}: {e}"))
+                continue
+            self.batches += 1
+            self.batch_frames += len(frames)
+            start = 0
+            for client, request_id, request_frames in batch:
+                client.requests += 1
+                client.frames += len(request_frames)
+                client.in_flight = False
+                client.send(("result", request_id, results[start:start + len(request_frames)]))
+                start += len(request_frames)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "mean_batch": self.batch_frames / self.batches if self.batches else None,
+                "queued": self._queued,
+                "clients": {client.id: {"requests": client.requests, "frames": client.frames,
+                                        "rejected": client.rejected}
+                            for client in self.clients.values()},
+            }
+
+
+_tracker_lock = threading.Lock()
+
+
+def _attach_untracked(name):
+    """Attach to a segment the server created without registering it with a resource tracker.
+
+    The server is the segment's only owner: its tracker registered it on
+    creation and unlink() unregisters it. Spawned clients share that tracker,
+    so a client that registered and unregistered the name too would remove
+    the server's entry and make its unlink() fail with a KeyError.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass  # track= is Python 3.13+; before that every attach registers the segment
+    with _tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class RemoteModel:
+    """Client for InferenceServer; detect_batch has the same contract as a local backend."""
+
+    def __init__(self, address=ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey or AUTHKEY or read_authkey(address)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._connect()
+
+    def _connect(self):
+        self.conn = connection.Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        self.conn.send(("attach",))
+        _, name, self.slots, self.slot_bytes = self.conn.recv()
+        self.shm = _attach_untracked(name)
+
+    def _reconnect(self):
+        try:
+            self.close()
+        except OSError:
+            pass
+        self._connect()
+
+    def detect_batch(self, frames, imgsz=None):
+        frames = list(frames)
+        results = []
+        with self._lock:
+            for start in range(0, len(frames), self.slots):
+                chunk = frames[start:start + self.slots]
+                try:
+                    results.extend(self._detect(chunk, imgsz))
+                except (EOFError, OSError):
+                    # The server restarted or dropped this client: attach a fresh ring and retry once
+                    self._reconnect()
+                    results.extend(self._detect(chunk, imgsz))
+        return results
+
+    def _detect(self, frames, imgsz):
+        shapes = []
+        for slot, frame in enumerate(frames):
+            if frame.nbytes > self.slot_bytes:
+                raise ValueError(f"frame of {frame.nbytes} bytes does not fit an inference slot "
+                                 f"({self.slot_bytes}); raise FALL_INFERENCE_SLOT_BYTES")
+            view = np.ndarray(frame.shape, np.uint8, self.shm.buf, offset=slot * self.slot_bytes)
+            view[...] = frame
+            shapes.append(frame.shape)
+        del view
+
+        self._next_id += 1
+        while True:
+            self.conn.send(("detect", self._next_id, shapes, imgsz))
+            reply = self.conn.recv()
+            if reply[0] == "busy":
+                time.sleep(BUSY_BACKOFF_SECONDS)
+                continue
+            if reply[0] == "error":
+                raise RuntimeError(f"inference server: {reply[2]}")
+            return reply[2]
+
+    def server_stats(self):
+        with self._lock:
+            self.conn.send(("stats",))
+            return self.conn.recv()[1]
+
+    def close(self):
+        self.shm.close()
+        self.conn.close()
+
+
+_remote = None
+_remote_lock = threading.Lock()
+
+
+def get_remote_model(address=ADDRESS, authkey=None):
+    """This process's connection to the server, opened on first use and after it was lost."""
+    global _remote
+    with _remote_lock:
+        if _remote is not None and _remote.conn.closed:
+            _remote = None  # a reconnect in detect_batch failed; start over
+        if _remote is None:
+            _remote = RemoteModel(address, authkey)
+        return _remote
+
+
+def _key_path(address):
+    return address + ".key"
+
+
+def write_authkey(address, authkey):
+    path = _key_path(address)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+
+
+def read_authkey(address=ADDRESS):
+    with open(_key_path(address), "rb") as f:
+        return f.read()
+
+
+def is_running(address=ADDRESS, authkey=None):
+    try:
+        connection.Client(address, family="AF_UNIX", authkey=authkey or AUTHKEY or os.urandom(32)).close()
+        return True
+    except multiprocessing.AuthenticationError:
+        return True  # someone else's server holds the address; starting ours would unlink its socket
+    except OSError:
+        return False
+
+
+def serve(weights_path=model_registry.DEFAULT_WEIGHTS, backend=model_registry.DEFAULT_BACKEND,
+          threads=None, address=ADDRESS, parent_pid=None, authkey=None, **kwargs):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    model = model_registry.warm_up(weights_path, backend, threads)
+    if parent_pid is not None:
+        def watch_parent():
+            while os.getppid() == parent_pid:
+                time.sleep(1)
+            os._exit(0)
+        threading.Thread(target=watch_parent, daemon=True).start()
+    InferenceServer(model, address, authkey, **kwargs).serve_forever()
+
+
+def start_process(context, weights_path, backend, threads=None, address=ADDRESS, authkey=None):
+    """Start serve() in a child process and wait until it accepts connections."""
+    process = context.Process(target=serve, name="fall-inference-server", daemon=True,
+                              args=(weights_path, backend, threads, address, os.getpid(), authkey))
+    process.start()
+    deadline = time.monotonic() + START_TIMEOUT_SECONDS
+    while not is_running(address, authkey):
+        if not process.is_alive() or time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError("inference server did not start")
+        time.sleep(0.1)
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory inference server")
+    parser.add_argument("--weights", default=model_registry.DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", default=model_registry.DEFAULT_BACKEND,
+                        choices=model_registry.BACKEND_CHOICES)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--address", default=ADDRESS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--quantum", type=int, default=CLIENT_QUANTUM, help="frames per client per batch")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="waiting requests before 'busy'")
+    parser.add_argument("--status", action="store_true", help="print a running server's stats and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        remote = RemoteModel(args.address)
+        print(remote.server_stats())
+        remote.close()
+        return
+    print(f"Serving {args.weights} ({args.backend}) on {args.address}")
+    serve(args.weights, args.backend, args.threads, args.address,
+          max_batch=args.max_batch, client_quantum=args.quantum, max_queue=args.max_queue)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Background video processing jobs for the Streamlit app.
+
+Uploads are streamed into JOB_DIR/<job id>/ and queued in a SQLite table.
+JOB_WORKERS worker processes, started once per server process by
+get_runner(), claim queued jobs, run them through video_processor and write
+their progress back to the table. The UI only polls rows by job id, so a job
+keeps running, and its result stays available, across reruns and page reloads.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import detection_cache
+import inference_server
+import metrics
+import model_registry
+import motion
+import roi
+import video_processor
+
+JOBS_DB = os.environ.get("FALL_JOBS_DB", "jobs.db")
+JOB_DIR = os.environ.get("FALL_JOB_DIR", "jobs")
+JOB_WORKERS = int(os.environ.get("FALL_JOB_WORKERS", "2"))
+METRICS_DIR = os.environ.get("FALL_JOB_METRICS_DIR", "job_metrics")
+METRICS_EXPORT_SECONDS = 5
+MODEL_PATH = os.environ.get("FALL_MODEL_PATH", model_registry.DEFAULT_WEIGHTS)
+POLL_SECONDS = 0.5
+PROGRESS_EVERY_SECONDS = 0.5
+COPY_CHUNK = 1024 * 1024
+STALE_UPLOAD_SECONDS = 24 * 60 * 60
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input_name TEXT,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    options TEXT NOT NULL,
+    claim_token TEXT,
+    worker_pid INTEGER,
+    frames_done INTEGER NOT NULL DEFAULT 0,
+    frames_total INTEGER NOT NULL DEFAULT 0,
+    alerts INTEGER NOT NULL DEFAULT 0,
+    stats TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs (status, created_at);
+"""
+
+JOB_COLUMNS = ("id, created_at, updated_at, status, input_name, input_path, output_path, options,"
+               " worker_pid, frames_done, frames_total, alerts, stats, error")
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["options"] = json.loads(job["options"])
+    job["stats"] = json.loads(job["stats"]) if job["stats"] else None
+    job["output_name"] = os.path.basename(job["output_path"])
+    return job
+
+
+class JobStore:
+    """SQLite table of jobs, shared by the Streamlit process and the workers."""
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, job_id, input_name, input_path, output_path, options):
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, created_at, updated_at, status, input_name, input_path, output_path,"
+                " options) VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, now, now, input_name, input_path, output_path, json.dumps(options)))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self._connect().execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list_jobs(self, limit=50):
+        rows = self._connect().execute(
+            f"SELECT {JOB_COLUMNS} FROM jobs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def count(self, status):
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def claim_next(self, worker_pid):
+        """Atomically mark the oldest queued job as running for worker_pid and return it."""
+        token = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', claim_token = ?, worker_pid = ?, updated_at = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1)",
+                (token, worker_pid, _now()))
+        row = self._connect().execute(
+            f"SELECT {JOB_COLUMNS} FROM jobs WHERE claim_token = ?", (token,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def progress(self, job_id, frames_done, frames_total, alerts):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET frames_done = ?, frames_total = ?, alerts = ?, updated_at = ?"
+                         " WHERE id = ?", (frames_done, frames_total, alerts, _now(), job_id))
+
+    def finish(self, job_id, stats, alerts):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', stats = ?, alerts = ?, frames_done = frames_total,"
+                         " updated_at = ? WHERE id = ?", (json.dumps(stats), alerts, _now(), job_id))
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                         (error, _now(), job_id))
+
+    def requeue_running(self):
+        """Put jobs left 'running' by workers of a previous server process back in the queue."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', claim_token = NULL, worker_pid = NULL, frames_done = 0,"
+                " updated_at = ? WHERE status = 'running'", (_now(),)).rowcount
+
+    def delete(self, job_id):
+        job = self.get(job_id)
+        if job is None or job["status"] == "running":
+            return False
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(os.path.dirname(job["input_path"]), ignore_errors=True)
+        return True
+
+
+def detections_key(input_path, weights_path, backend, options):
+    """Cache key for input_path under the sampling process_video will use for these job options."""
+    settings = options.get("alert_settings", {})
+    if settings.get("adaptive", True):
+        # Which frames the motion scheduler picks depends on the batches and on what counts as a fall
+        sampling = {
+            "adaptive": True,
+            "min_interval": settings.get("min_interval", motion.MIN_INTERVAL),
+            "max_interval": settings.get("max_interval", motion.MAX_INTERVAL),
+            "max_alert_delay_seconds": settings.get("max_alert_delay_seconds",
+                                                    motion.MAX_ALERT_DELAY_SECONDS),
+            "batch_size": options.get("batch_size", video_processor.BATCH_SIZE),
+            "confidence_threshold": settings.get("confidence_threshold",
+                                                 video_processor.CONFIDENCE_THRESHOLD),
+        }
+    else:
+        sampling = {"adaptive": False,
+                    "skip_frames": settings.get("skip_frames", video_processor.SKIP_FRAMES)}
+    if settings.get("roi_mode"):
+        sampling["roi_mode"] = True
+        sampling["roi_rescan_every"] = settings.get("roi_rescan_every", roi.RESCAN_EVERY)
+    model_hash = f"{backend}:{model_registry.file_hash(weights_path)}"
+    return detection_cache.cache_key(model_registry.file_hash(input_path), model_hash,
+                                     video_processor.PROCESS_WIDTH, sampling)
+
+
+def run_job(store, job, inference_authkey=None):
+    """Process one claimed job, reporting progress to store; returns (stats, alert_count)."""
+    import emergency
+
+    options = job["options"]
+    weights_path = options.get("weights", MODEL_PATH)
+    backend = options.get("backend", model_registry.DEFAULT_BACKEND)
+    cache = detection_cache.get_cache()
+    key = detections_key(job["input_path"], weights_path, backend, options)
+    hit = cache.load(key)
+    model = cached = model_stats = None
+    if hit:
+        cached = detection_cache.CachedDetections(hit[0])
+    elif inference_server.ENABLED and (weights_path, backend) == (MODEL_PATH, model_registry.DEFAULT_BACKEND):
+        model = inference_server.get_remote_model(authkey=inference_authkey)
+    else:
+        cache_hits = model_registry.get_metrics()["cache_hits"]
+        model = model_registry.get_model(weights_path, backend)
+        model_stats = model_registry.get_metrics()
+        model_stats["cache_hit"] = model_stats["cache_hits"] > cache_hits
+
+    alert_count = 0
+    last_report = 0.0
+
+    def on_progress(frame_count, total_frames):
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_EVERY_SECONDS:
+            last_report = now
+            store.progress(job["id"], frame_count, total_frames, alert_count)
+
+    def on_alert(alert):
+        nonlocal alert_count
+        emergency.raise_alert(alert, source=job["id"])
+        alert_count += 1
+
+    stats = video_processor.process_video(job["input_path"], job["output_path"], model,
+                                          on_progress=on_progress, on_alert=on_alert,
+                                          batch_size=options.get("batch_size", video_processor.BATCH_SIZE),
+                                          cached=cached, **options.get("alert_settings", {}))
+    if stats is None:
+        raise RuntimeError("could not open the uploaded video")
+
+    timeline = stats.pop("timeline")
+    if not hit:
+        cache.save(key, timeline, {"fps": stats["fps"], "frames": stats["frames"]})
+    stats["cached_detections"] = bool(hit)
+    if model_stats is not None:
+        stats["model_registry"] = model_stats
+    return stats, alert_count
+
+
+def _export_metrics(path):
+    # The server process merges these files into its /metrics endpoint
+    try:
+        metrics.write_snapshot(path)
+    except OSError:
+        pass
+
+
+def _export_metrics_forever(path):
+    while True:
+        _export_metrics(path)
+        time.sleep(METRICS_EXPORT_SECONDS)
+
+
+def _worker_main(db_path, torch_threads, parent_pid, metrics_dir=METRICS_DIR, inference_authkey=None):
+    import torch
+    torch.set_num_threads(torch_threads)
+    metrics_path = os.path.join(metrics_dir, f"{os.getpid()}.json")
+    threading.Thread(target=_export_metrics_forever, name="fall-metrics-export", daemon=True,
+                     args=(metrics_path,)).start()
+    if os.path.exists(MODEL_PATH) and not inference_server.ENABLED:
+        model_registry.warm_up(MODEL_PATH)
+
+    store = JobStore(db_path)
+    while os.getppid() == parent_pid:
+        job = store.claim_next(os.getpid())
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        try:
+            stats, alerts = run_job(store, job, inference_authkey)
+        except Exception as e:
+            store.fail(job["id"], f"{type(e).__name__}: {e}")
+            continue
+        finally:
+            _export_metrics(metrics_path)
+        store.finish(job["id"], stats, alerts)
+        try:
+            os.unlink(job["input_path"])
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """Pool of worker processes that drain the jobs table."""
+
+    def __init__(self, workers=JOB_WORKERS, db_path=JOBS_DB, metrics_dir=METRICS_DIR):
+        self.workers = max(1, workers)
+        self.db_path = db_path
+        self.metrics_dir = metrics_dir
+        self.store = JobStore(db_path)
+        self.processes = []
+        self.server_process = None
+        # Only this runner's server and workers know the key; FALL_INFERENCE_AUTHKEY shares an external server
+        self.inference_authkey = inference_server.AUTHKEY or os.urandom(32)
+        self._context = multiprocessing.get_context("spawn")
+
+    def start(self):
+        self.store.requeue_running()
+        self.remove_stale_uploads()
+        # Snapshots left by a previous server process would be summed into this one's counters
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        metrics.add_snapshot_dir(self.metrics_dir)
+        self.ensure_workers()
+
+    def ensure_workers(self):
+        """Start workers up to the configured count, replacing any that died."""
+        self.processes = [p for p in self.processes if p.is_alive()]
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        torch_threads = max(1, cores // self.workers)
+        if inference_server.ENABLED and os.path.exists(MODEL_PATH):
+            # One server process owns the model and the cores; workers only decode and draw
+            torch_threads = 1
+            server_down = self.server_process is None or not self.server_process.is_alive()
+            if server_down and not inference_server.is_running(authkey=self.inference_authkey):
+                self.server_process = inference_server.start_process(
+                    self._context, MODEL_PATH, model_registry.DEFAULT_BACKEND, threads=cores,
+                    authkey=self.inference_authkey)
+        while len(self.processes) < self.workers:
+            process = self._context.Process(target=_worker_main, name="fall-job-worker", daemon=True,
+                                            args=(self.db_path, torch_threads, os.getpid(),
+                                                  self.metrics_dir, self.inference_authkey))
+            process.start()
+            self.processes.append(process)
+
+    def submit(self, job_id, filename, input_path, options):
+        """Queue a video already staged with stage_upload."""
+        base = os.path.splitext(os.path.basename(filename))[0]
+        output_path = os.path.join(os.path.dirname(input_path), f"processed_{base}.avi")
+        self.store.add(job_id, filename, input_path, output_path, options)
+        self.ensure_workers()
+        return job_id
+
+    def submit_upload(self, fileobj, filename, options, size=None):
+        """Stream an upload to disk in chunks and queue it; returns the job id."""
+        job_id, input_path = stage_upload(fileobj, filename, size)
+        return self.submit(job_id, filename, input_path, options)
+
+    def remove_stale_uploads(self, max_age_seconds=STALE_UPLOAD_SECONDS):
+        """Delete staged uploads that were never submitted."""
+        if not os.path.isdir(JOB_DIR):
+            return
+        cutoff = time.time() - max_age_seconds
+        for job_id in os.listdir(JOB_DIR):
+            job_dir = os.path.join(JOB_DIR, job_id)
+            if os.path.getmtime(job_dir) < cutoff and self.store.get(job_id) is None:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def copy_chunks(src, dst, size=None, chunk_size=COPY_CHUNK):
+    """Copy src to dst chunk by chunk, stopping after size bytes when given."""
+    remaining = size
+    while remaining is None or remaining > 0:
+        chunk = src.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        dst.write(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+    if remaining:
+        raise EOFError(f"upload ended {remaining} bytes early")
+
+
+def stage_upload(fileobj, filename, size=None):
+    """Write an upload into a fresh job directory without holding it in memory.
+
+    Returns (job_id, input_path); the job is not queued until JobRunner.submit.
+    """
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOB_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    ext = os.path.splitext(os.path.basename(filename))[1].lower()
+    input_path = os.path.join(job_dir, "input" + (ext or ".mp4"))
+    try:
+        with open(input_path, "wb") as f:
+            copy_chunks(fileobj, f, size)
+    except BaseException:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    return job_id, input_path
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+            _runner.start()
+        return _runner
@@ -0,0 +1,21 @@
+"""Aspect-preserving resize and pad, shared by the inference backends and the training cache."""
+import cv2
+
+IMGSZ = 640
+PAD_VALUE = 114
+
+
+def letterbox(frame, imgsz=IMGSZ):
+    """Resize keeping aspect ratio and pad to imgsz x imgsz, like ultralytics' LetterBox."""
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+    return frame, ratio, (left, top)
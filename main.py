@@ -5,6 +5,8 @@
 from ultralytics import YOLO
 import yaml
 
+import dataset_cache
+
 
 # -------------------------------
 # PART 1: Create data.yaml file
@@ -32,6 +34,14 @@ with open("data.yaml", "w") as f:
 print("data.yaml created successfully!")
 print(yaml.dump(data_yaml))
 
+# -------------------------------
+# PART 1b: Decode the images once
+# -------------------------------
+
+# Letterboxes every train/val image into a memory-mapped cache (dataset_cache/).
+# Re-running only rebuilds a split when its images or labels changed.
+dataset_cache.prepare("data.yaml", imgsz=640)
+
 # -------------------------------
 # PART 2: Train the YOLO model
 # -------------------------------
@@ -48,7 +58,9 @@ results = model.train(
     name='yolo12n_model',     # name of this training run
     verbose=True,             # print detailed training info
     patience=0,               # stop early if no improvement (0 = disabled)
-    lr0=0.001                 # initial learning rate
+    lr0=0.001,                # initial learning rate
+    trainer=dataset_cache.CachedDetectionTrainer,  # read images from the cache instead of decoding
+    workers=8                 # dataloader processes reading from the cache
 )
 
 # After training, the best weights are saved in:
@@ -0,0 +1,293 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = os.environ.get("FALL_METRICS_PORT")
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        return [(name, self.labels, self.value)]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, labels, buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) by interpolating inside the bucket."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q / 100 * total
+        seen = 0
+        for idx, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                upper = self.buckets[idx] if idx < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self, name):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append((f"{name}_bucket", self.labels + (("le", le),), cumulative))
+        samples.append((f"{name}_sum", self.labels, value_sum))
+        samples.append((f"{name}_count", self.labels, total))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(key[1], **kwargs)
+                    self._metrics[key] = metric
+                    self._help.setdefault(name, (cls.kind, help_text))
+        return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def collect(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        last_name = None
+        for (name, _), metric in self.collect():
+            if name != last_name:
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text or name}")
+                lines.append(f"# TYPE {name} {kind}")
+                last_name = name
+            for sample_name, labels, value in metric.samples(name):
+                lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Every metric as JSON-able dicts, for merge() in another process."""
+        entries = []
+        for (name, labels), metric in self.collect():
+            kind, help_text = self._help[name]
+            entry = {"name": name, "labels": list(labels), "kind": kind, "help": help_text}
+            if isinstance(metric, Histogram):
+                with metric._lock:
+                    entry.update(buckets=list(metric.buckets), counts=list(metric.counts),
+                                 sum=metric.sum, count=metric.count)
+            else:
+                entry["value"] = metric.value
+            entries.append(entry)
+        return entries
+
+    def merge(self, entries, gauges=True):
+        """Add a snapshot() from another process into this registry, summing matching series."""
+        for entry in entries:
+            labels = {key: value for key, value in entry["labels"]}
+            if entry["kind"] == "histogram":
+                metric = self.histogram(entry["name"], entry["help"], buckets=tuple(entry["buckets"]), **labels)
+                if list(metric.buckets) != entry["buckets"]:
+                    continue
+                with metric._lock:
+                    metric.counts = [a + b for a, b in zip(metric.counts, entry["counts"])]
+                    metric.sum += entry["sum"]
+                    metric.count += entry["count"]
+            elif entry["kind"] == "counter":
+                self.counter(entry["name"], entry["help"], **labels).inc(entry["value"])
+            elif gauges:
+                self.gauge(entry["name"], entry["help"], **labels).inc(entry["value"])
+
+    def summary(self):
+        """In-process view: counters/gauges as values, histograms as count and p50/p95/p99."""
+        result = {}
+        for (name, labels), metric in self.collect():
+            key = name + _format_labels(labels)
+            if isinstance(metric, Histogram):
+                result[key] = {
+                    "count": metric.count,
+                    "p50": metric.percentile(50),
+                    "p95": metric.percentile(95),
+                    "p99": metric.percentile(99),
+                }
+            else:
+                result[key] = metric.value
+        return result
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+summary = REGISTRY.summary
+_snapshot_dirs = []
+
+
+def write_snapshot(path):
+    """Atomically dump this process's registry to path for the serving process to merge."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def add_snapshot_dir(directory):
+    """Merge every <pid>.json written by write_snapshot() under directory into /metrics."""
+    if directory not in _snapshot_dirs:
+        _snapshot_dirs.append(directory)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def render_prometheus():
+    """This process's metrics plus the snapshots of its workers, summed per series.
+
+    Counters and histograms of a worker that has exited still count; its gauges
+    are dropped, since they describe state that no longer exists.
+    """
+    if not _snapshot_dirs:
+        return REGISTRY.render()
+    combined = Registry()
+    combined.merge(REGISTRY.snapshot())
+    for directory in _snapshot_dirs:
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            pid, ext = os.path.splitext(name)
+            if ext != ".json" or not pid.isdigit():
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                continue
+            combined.merge(entries, gauges=_pid_alive(int(pid)))
+    return combined.render()
+
+
+def stage_histogram(stage):
+    return histogram("fall_stage_seconds", "Time spent per frame or batch in each processing stage",
+                     stage=stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve /metrics on host:port from a daemon thread; safe to call more than once."""
+    port = int(port)
+    with _servers_lock:
+        if port not in _servers:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            _servers[port] = server
+        return _servers[port]
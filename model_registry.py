@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from ultralytics import YOLO
+
+import backends
+from detection import detect_all
+
+DEFAULT_WEIGHTS = "best.pt"
+DEFAULT_BACKEND = os.environ.get("FALL_MODEL_BACKEND", "torch")
+BACKEND_CHOICES = ["torch"] + sorted(backends.BACKENDS)
+MAX_MODELS = 2
+IDLE_TIMEOUT_SECONDS = 30 * 60
+WARMUP_SIZE = 640
+
+# Streamlit imports this module once per server process, so these globals are
+# shared by every session and every rerun of the script.
+_lock = threading.Lock()
+_models = OrderedDict()
+_hash_cache = {}
+
+metrics = {
+    "startup_load_seconds": None,
+    "startup_warmup_seconds": None,
+    "last_job_load_seconds": None,
+    "loads": 0,
+    "cache_hits": 0,
+    "evictions": 0,
+}
+
+
+def file_hash(path):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _hash_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    _hash_cache[path] = (signature, value)
+    return value
+
+
+def _load(weights_path, backend, threads):
+    start = time.perf_counter()
+    if backend == "torch":
+        model = YOLO(weights_path)
+        model.fuse()
+    else:
+        model = backends.load_backend(backend, weights_path, threads=threads)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    detect_all(np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8), model)
+    warmup_seconds = time.perf_counter() - start
+
+    return model, load_seconds, warmup_seconds
+
+
+def _evict(now):
+    for key in list(_models):
+        if now - _models[key]["last_used"] > IDLE_TIMEOUT_SECONDS:
+            del _models[key]
+            metrics["evictions"] += 1
+    while len(_models) > MAX_MODELS:
+        _models.popitem(last=False)
+        metrics["evictions"] += 1
+
+
+def _acquire(weights_path, backend, threads=None):
+    key = (backend, os.path.abspath(weights_path), file_hash(weights_path))
+
+    with _lock:
+        now = time.time()
+        entry = _models.get(key)
+        if entry is None:
+            model, load_seconds, warmup_seconds = _load(weights_path, backend, threads)
+            entry = {
+                "model": model,
+                "load_seconds": load_seconds,
+                "warmup_seconds": warmup_seconds,
+                "last_used": now,
+            }
+            _models[key] = entry
+            metrics["loads"] += 1
+        else:
+            metrics["cache_hits"] += 1
+
+        entry["last_used"] = now
+        _models.move_to_end(key)
+        _evict(now)
+
+    return entry
+
+
+def warm_up(weights_path=DEFAULT_WEIGHTS, backend=DEFAULT_BACKEND, threads=None):
+    """Load and warm up weights_path at startup without counting it as a job."""
+    entry = _acquire(weights_path, backend, threads)
+    if metrics["startup_load_seconds"] is None:
+        metrics["startup_load_seconds"] = entry["load_seconds"]
+        metrics["startup_warmup_seconds"] = entry["warmup_seconds"]
+    return entry["model"]
+
+
+def get_model(weights_path=DEFAULT_WEIGHTS, backend=DEFAULT_BACKEND, threads=None):
+    """Return a fused, warmed-up model for weights_path, loading it at most once.
+
+    Entries are keyed by backend, absolute path and file hash, so replacing the
+    weights file on disk picks up the new model on the next call. backend is
+    "torch" for .pt weights, or "onnx"/"openvino" for an exported model;
+    threads caps the CPU threads of those backends when they are first loaded.
+    """
+    start = time.perf_counter()
+    model = _acquire(weights_path, backend, threads)["model"]
+    metrics["last_job_load_seconds"] = time.perf_counter() - start
+    return model
+
+
+def evict_idle():
+    with _lock:
+        _evict(time.time())
+
+
+def clear():
+    with _lock:
+        _models.clear()
+
+
+def get_metrics():
+    with _lock:
+        return dict(metrics, cached_models=len(_models))
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+MOTION_WIDTH = 64
+PIXEL_THRESHOLD = 20
+MOTION_AREA = 0.005
+MIN_INTERVAL = 2
+MAX_INTERVAL = 15
+MAX_ALERT_DELAY_SECONDS = 1.0
+
+
+def small_gray(frame):
+    """frame shrunk to MOTION_WIDTH pixels wide, in grayscale, for cheap differencing."""
+    height, width = frame.shape[:2]
+    size = (MOTION_WIDTH, max(1, int(height * MOTION_WIDTH / width)))
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+class MotionScheduler:
+    """Decides per frame whether to run inference, using cheap frame differencing.
+
+    Every frame is shrunk to MOTION_WIDTH pixels wide and converted to
+    grayscale, then compared with the last analysed frame. While the scene is
+    still the inference interval doubles up to max_interval. Motion or a fall
+    in the last analysed frame drops it straight back to min_interval.
+
+    max_interval is capped at max_alert_delay_seconds * fps. A fall that starts
+    in a still scene is then picked up at most that late, and the fall timer
+    behind the alert starts counting no later than that.
+    """
+
+    def __init__(self, fps, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 max_alert_delay_seconds=MAX_ALERT_DELAY_SECONDS,
+                 pixel_threshold=PIXEL_THRESHOLD, motion_area=MOTION_AREA):
+        self.min_interval = max(1, min_interval)
+        delay_frames = int(max_alert_delay_seconds * fps) if fps > 0 else max_interval
+        self.max_interval = max(self.min_interval, min(max_interval, delay_frames))
+        self.pixel_threshold = pixel_threshold
+        self.motion_area = motion_area
+
+        self.interval = self.min_interval
+        self.frames_since = 0
+        self.reference = None
+        self.fall_active = False
+
+        self.frames_seen = 0
+        self.motion_frames = 0
+
+    def should_analyse(self, frame):
+        self.frames_seen += 1
+        self.frames_since += 1
+        gray = small_gray(frame)
+
+        if self.reference is None:
+            motion = True
+        else:
+            changed = cv2.absdiff(gray, self.reference) > self.pixel_threshold
+            motion = np.count_nonzero(changed) > self.motion_area * changed.size
+        if motion:
+            self.motion_frames += 1
+
+        if motion or self.fall_active:
+            self.interval = self.min_interval
+        if self.frames_since < self.interval:
+            return False
+
+        self.frames_since = 0
+        self.reference = gray
+        if not motion and not self.fall_active:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return True
+
+    def observe(self, fall_seen):
+        """Report whether the latest analysed frame contained a fall."""
+        self.fall_active = fall_seen
+
+    def stats(self, frames_analysed):
+        baseline = self.frames_seen // self.min_interval
+        return {
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "motion_frames": self.motion_frames,
+            "baseline_inferences": baseline,
+            "inferences_saved": max(0, baseline - frames_analysed),
+        }
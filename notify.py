@@ -0,0 +1,397 @@
+"""Delivers fall alerts to the family and nearby hospitals off the detection path.
+
+AlertDispatcher runs an asyncio loop in a daemon thread. submit() only hands
+the alert over, so the frame loop never waits on the network. Each recipient
+names a channel ("webhook" or "email") and an address. Alerts for the same
+recipient that arrive within batch_seconds go out as one message. Failed
+deliveries are retried with jittered exponential backoff, and every message
+carries an idempotency key, so a retry the receiver already accepted is
+harmless. A repeat alert for a fall that is still in progress is dropped.
+
+Run this module to send a few alerts through local mock webhook and SMTP
+servers and print the delivery stats.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import smtplib
+import socketserver
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+
+SMTP_HOST = os.environ.get("FALL_SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("FALL_SMTP_PORT", "25"))
+SMTP_SENDER = os.environ.get("FALL_SMTP_SENDER", "alerts@fall-detection.local")
+FAMILY_WEBHOOK = os.environ.get("FALL_FAMILY_WEBHOOK")
+FAMILY_EMAIL = os.environ.get("FALL_FAMILY_EMAIL")
+
+SEND_TIMEOUT_SECONDS = 5
+MAX_CONCURRENCY = 8
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+DEDUPE_SECONDS = 120
+DEDUPE_HISTORY = 10000
+BATCH_SECONDS = 0.5
+SENT_HISTORY = 10000
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def alert_text(payload):
+    lines = []
+    for alert in payload["alerts"]:
+        location = alert["location"]
+        lines.append(f"Fall alert #{alert['id']} at {alert['timestamp']}: on the ground for "
+                     f"{alert['fall_duration']:.0f}s at {location['address']} "
+                     f"({location['lat']}, {location['lng']}), phone {location['phone']}")
+    return "\n".join(lines)
+
+
+class WebhookChannel:
+    """POSTs the payload as JSON with an Idempotency-Key header."""
+
+    def __init__(self, timeout=SEND_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    async def send(self, address, payload, key):
+        await asyncio.to_thread(self._post, address, payload, key)
+
+    def _post(self, address, payload, key):
+        request = urllib.request.Request(
+            address, data=json.dumps(payload).encode(), method="POST",
+            headers={"Content-Type": "application/json", "Idempotency-Key": key})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            raise DeliveryError(f"HTTP {e.code}", retryable=e.code >= 500 or e.code == 429)
+        except OSError as e:
+            raise DeliveryError(str(e))
+
+
+class SmtpChannel:
+    """Sends a plain-text email; the idempotency key becomes the Message-ID."""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, sender=SMTP_SENDER, timeout=SEND_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    async def send(self, address, payload, key):
+        await asyncio.to_thread(self._send, address, payload, key)
+
+    def _send(self, address, payload, key):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = address
+        message["Subject"] = f"FALL ALERT: {len(payload['alerts'])} alert(s) need attention"
+        message["Message-ID"] = f"<{key}@fall-detection>"
+        message.set_content(alert_text(payload))
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise DeliveryError(str(e), retryable=False)
+        except smtplib.SMTPResponseException as e:
+            raise DeliveryError(f"SMTP {e.smtp_code}", retryable=e.smtp_code < 500)
+        except (smtplib.SMTPException, OSError) as e:
+            raise DeliveryError(str(e))
+
+
+def idempotency_key(recipient, alerts):
+    ids = ",".join(sorted(str(alert["id"]) for alert in alerts))
+    return hashlib.sha256(f"{recipient['channel']}|{recipient['address']}|{ids}".encode()).hexdigest()[:32]
+
+
+class AlertDispatcher:
+    """Fans alerts out over pluggable channels from a background asyncio loop.
+
+    channels maps a channel name to an object with an async
+    send(address, payload, key) that raises DeliveryError on failure. At most
+    max_concurrency sends are in flight at once. A submit whose dedupe_key
+    was first seen less than dedupe_seconds earlier counts as the same ongoing
+    fall and is dropped. Times are event_time when given (seconds into the
+    video, so offline jobs running faster than real time are judged on
+    video time), otherwise the wall clock. Failures are counted in stats(),
+    which also holds the last error.
+    """
+
+    def __init__(self, channels=None, max_concurrency=MAX_CONCURRENCY, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                 dedupe_seconds=DEDUPE_SECONDS, batch_seconds=BATCH_SECONDS):
+        self.channels = channels or {"webhook": WebhookChannel(), "email": SmtpChannel()}
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dedupe_seconds = dedupe_seconds
+        self.batch_seconds = batch_seconds
+
+        self.counts = {"submitted": 0, "deduplicated": 0, "delivered": 0, "failed": 0, "retries": 0}
+        self._first_seen = OrderedDict()
+        self.last_error = None
+        self._sent = OrderedDict()
+        self._pending = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+
+    def start(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                threading.Thread(target=self._loop.run_forever, name="alert-dispatch", daemon=True).start()
+        return self
+
+    def submit(self, alert, recipients, dedupe_key=None, event_time=None):
+        """Queue alert for every recipient; returns False when it repeats an ongoing fall."""
+        now = time.monotonic()
+        at = now if event_time is None else event_time
+        with self._lock:
+            if dedupe_key is not None:
+                first = self._first_seen.get(dedupe_key)
+                if first is not None and 0 <= at - first < self.dedupe_seconds:
+                    self.counts["deduplicated"] += 1
+                    metrics.counter("fall_alerts_deduplicated_total", "Repeat alerts collapsed").inc()
+                    return False
+                self._first_seen[dedupe_key] = at
+                self._first_seen.move_to_end(dedupe_key)
+                while len(self._first_seen) > DEDUPE_HISTORY:
+                    self._first_seen.popitem(last=False)
+            self.counts["submitted"] += 1
+        self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, alert, list(recipients), now)
+        return True
+
+    def _enqueue(self, alert, recipients, submitted):
+        for recipient in recipients:
+            batch_key = (recipient["channel"], recipient["address"])
+            if batch_key not in self._pending:
+                self._pending[batch_key] = []
+                self._loop.call_later(self.batch_seconds, self._flush, batch_key, recipient)
+            self._pending[batch_key].append((alert, submitted))
+
+    def _flush(self, batch_key, recipient):
+        batch = self._pending.pop(batch_key)
+        task = self._loop.create_task(self._deliver(recipient, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, recipient, batch):
+        channel_name = recipient["channel"]
+        channel = self.channels[channel_name]
+        alerts = [alert for alert, _ in batch]
+        key = idempotency_key(recipient, alerts)
+        if key in self._sent:
+            return
+        payload = {"recipient": recipient["id"], "alerts": alerts}
+
+        for attempt in range(1, self.max_attempts + 1):
+            async with self._semaphore:
+                try:
+                    await channel.send(recipient["address"], payload, key)
+                    error = None
+                except DeliveryError as e:
+                    error = e
+            if error is None:
+                self._delivered(channel_name, key, batch)
+                return
+            if not error.retryable or attempt == self.max_attempts:
+                break
+            self.counts["retries"] += 1
+            metrics.counter("fall_alert_retries_total", "Alert delivery retries", channel=channel_name).inc()
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+        self.counts["failed"] += 1
+        metrics.counter("fall_alert_deliveries_total", "Alert deliveries by outcome",
+                        channel=channel_name, outcome="failed").inc()
+        self.last_error = {"recipient": recipient["id"], "channel": channel_name, "error": str(error),
+                           "time": time.time()}
+
+    def _delivered(self, channel_name, key, batch):
+        self._sent[key] = True
+        while len(self._sent) > SENT_HISTORY:
+            self._sent.popitem(last=False)
+        self.counts["delivered"] += 1
+        metrics.counter("fall_alert_deliveries_total", "Alert deliveries by outcome",
+                        channel=channel_name, outcome="delivered").inc()
+        latency = metrics.histogram("fall_alert_delivery_seconds", "Time from submit to delivery",
+                                    buckets=LATENCY_BUCKETS, channel=channel_name)
+        now = time.monotonic()
+        for _, submitted in batch:
+            latency.observe(now - submitted)
+
+    def drain(self, timeout=None):
+        """Block until everything submitted so far has been delivered or given up on."""
+        if self._loop is None:
+            return
+
+        async def wait():
+            while self._pending or self._tasks:
+                await asyncio.sleep(0.05)
+
+        asyncio.run_coroutine_threadsafe(wait(), self._loop).result(timeout)
+
+    def stats(self):
+        return dict(self.counts, pending=len(self._pending), in_flight=len(self._tasks),
+                    last_error=self.last_error)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher().start()
+        return _dispatcher
+
+
+class MockWebhookServer:
+    """Local webhook receiver for tests: fails the first fail_first requests with 503
+    and records each idempotency key once."""
+
+    def __init__(self, fail_first=0, port=0):
+        self.fail_first = fail_first
+        self.requests = []
+        self.duplicates = 0
+        self._keys = set()
+        self._lock = threading.Lock()
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with owner._lock:
+                    if owner.fail_first > 0:
+                        owner.fail_first -= 1
+                        self.send_error(503)
+                        return
+                    key = self.headers.get("Idempotency-Key")
+                    if key in owner._keys:
+                        owner.duplicates += 1
+                    else:
+                        owner._keys.add(key)
+                        owner.requests.append(body)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/alerts"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MockSmtpServer:
+    """Minimal local SMTP server for tests; keeps each received message as raw text."""
+
+    def __init__(self, port=0):
+        self.messages = []
+        owner = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                self.reply("220 mock SMTP ready")
+                while True:
+                    line = self.rfile.readline().decode(errors="replace").strip()
+                    if not line:
+                        return
+                    command = line[:4].upper()
+                    if command == "DATA":
+                        self.reply("354 end with <CRLF>.<CRLF>")
+                        data = []
+                        for raw in self.rfile:
+                            if raw in (b".\r\n", b".\n"):
+                                break
+                            data.append(raw.decode(errors="replace"))
+                        owner.messages.append("".join(data))
+                        self.reply("250 queued")
+                    elif command == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    elif command == "EHLO":
+                        self.reply("250 mock")
+                    else:
+                        self.reply("250 OK")
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatch sample alerts through local mock servers")
+    parser.add_argument("--alerts", type=int, default=20)
+    parser.add_argument("--fail-first", type=int, default=3, help="webhook requests to reject with 503")
+    args = parser.parse_args()
+
+    webhook = MockWebhookServer(fail_first=args.fail_first)
+    smtp = MockSmtpServer()
+    dispatcher = AlertDispatcher(
+        channels={"webhook": WebhookChannel(), "email": SmtpChannel("127.0.0.1", smtp.port)},
+        backoff=0.05, batch_seconds=0.1).start()
+    recipients = [
+        {"id": "family", "channel": "email", "address": "family@example.com"},
+        {"id": "city-general", "channel": "webhook", "address": webhook.url},
+    ]
+    location = {"address": "test address", "lat": 0.0, "lng": 0.0, "phone": "-"}
+
+    start = time.perf_counter()
+    for idx in range(args.alerts):
+        alert = {"id": idx, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "status": "CRITICAL",
+                 "location": location, "fall_duration": 10.0}
+        # Every other alert repeats the previous camera's ongoing fall
+        dispatcher.submit(alert, recipients, dedupe_key=f"camera-{idx // 2}")
+    submit_ms = (time.perf_counter() - start) * 1000
+    dispatcher.drain(timeout=60)
+
+    print(f"submit() total: {submit_ms:.2f} ms for {args.alerts} alerts")
+    print(f"dispatcher: {dispatcher.stats()}")
+    print(f"webhook: {len(webhook.requests)} accepted, {webhook.duplicates} duplicates; "
+          f"smtp: {len(smtp.messages)} messages")
+    for name, value in metrics.summary().items():
+        if name.startswith("fall_alert"):
+            print(f"{name}: {value}")
+    webhook.close()
+    smtp.close()
+
+
+if __name__ == "__main__":
+    main()
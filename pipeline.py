@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+
+import metrics
+
+QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+class StageTimer:
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+        self.items = 0
+
+    def as_dict(self):
+        return {
+            "busy_seconds": self.busy,
+            "wait_input_seconds": self.wait_input,
+            "wait_output_seconds": self.wait_output,
+            "items": self.items,
+        }
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _timers():
+    return {name: StageTimer(name) for name in ("decode", "inference", "write")}
+
+
+def run_serial(read, infer, flush, write):
+    """Drive the three stages in one loop; same contract as Pipeline.run."""
+    timers = _timers()
+
+    def timed(timer, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timer.busy += time.perf_counter() - start
+        return result
+
+    def write_all(items):
+        for item in items:
+            timed(timers["write"], write, item)
+            timers["write"].items += 1
+
+    while True:
+        item = timed(timers["decode"], read)
+        if item is None:
+            break
+        timers["decode"].items += 1
+        write_all(timed(timers["inference"], infer, item))
+        timers["inference"].items += 1
+    write_all(timed(timers["inference"], flush))
+
+    return {name: timer.as_dict() for name, timer in timers.items()}
+
+
+class Pipeline:
+    """Decode, inference and write stages on their own threads, joined by bounded queues.
+
+    read() returns the next item or None at the end of the input, infer(item)
+    and flush() return lists of items for the writer, and write(item) consumes
+    one item. Each stage handles items strictly in order, so the output is the
+    same as run_serial. Stages call notify(fn, *args) to run callbacks (progress,
+    alerts) on the thread that called run(), which matters for Streamlit.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.timers = _timers()
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.inferred = queue.Queue(maxsize=queue_size)
+        self.depth = {
+            id(self.decoded): metrics.gauge("fall_pipeline_queue_depth", "Items waiting between stages",
+                                            queue="decoded"),
+            id(self.inferred): metrics.gauge("fall_pipeline_queue_depth", "Items waiting between stages",
+                                             queue="inferred"),
+        }
+        self.events = queue.Queue()
+        self.stop = threading.Event()
+        self.errors = []
+
+    def notify(self, fn, *args):
+        self.events.put((fn, args))
+
+    def _put(self, q, item, timer):
+        start = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self.stop.is_set():
+                    raise _Stopped()
+        timer.wait_output += time.perf_counter() - start
+        self.depth[id(q)].set(q.qsize())
+
+    def _get(self, q, timer):
+        start = time.perf_counter()
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self.stop.is_set():
+                    raise _Stopped()
+        timer.wait_input += time.perf_counter() - start
+        self.depth[id(q)].set(q.qsize())
+        return item
+
+    def _stage(self, body):
+        def target():
+            try:
+                body()
+            except _Stopped:
+                pass
+            except BaseException as e:
+                self.errors.append(e)
+                self.stop.set()
+        return threading.Thread(target=target, daemon=True)
+
+    def run(self, read, infer, flush, write):
+        def decode():
+            timer = self.timers["decode"]
+            while True:
+                start = time.perf_counter()
+                item = read()
+                timer.busy += time.perf_counter() - start
+                if item is None:
+                    break
+                timer.items += 1
+                self._put(self.decoded, item, timer)
+            self._put(self.decoded, _DONE, timer)
+
+        def inference():
+            timer = self.timers["inference"]
+            while True:
+                item = self._get(self.decoded, timer)
+                start = time.perf_counter()
+                if item is _DONE:
+                    ready = flush()
+                else:
+                    ready = infer(item)
+                    timer.items += 1
+                timer.busy += time.perf_counter() - start
+                for result in ready:
+                    self._put(self.inferred, result, timer)
+                if item is _DONE:
+                    break
+            self._put(self.inferred, _DONE, timer)
+
+        def writer():
+            timer = self.timers["write"]
+            while True:
+                item = self._get(self.inferred, timer)
+                if item is _DONE:
+                    break
+                start = time.perf_counter()
+                write(item)
+                timer.busy += time.perf_counter() - start
+                timer.items += 1
+
+        threads = [self._stage(decode), self._stage(inference), self._stage(writer)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    fn, args = self.events.get(timeout=0.05)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads):
+                        break
+                    continue
+                fn(*args)
+            while not self.events.empty():
+                fn, args = self.events.get_nowait()
+                fn(*args)
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+        return {name: timer.as_dict() for name, timer in self.timers.items()}
@@ -0,0 +1,132 @@
+import json
+import time
+from collections import deque
+
+import metrics
+
+RESOLUTIONS = (320, 480, 640)
+TARGET_LATENCY_SECONDS = 0.5
+MAX_STRIDE = 4
+SMOOTHING = 0.2
+HEADROOM = 0.6
+COOLDOWN_BATCHES = 15
+AUDIT_HISTORY = 200
+
+
+class DeadlineScheduler:
+    """Keeps live inference inside a latency budget by trading resolution and sampling rate.
+
+    After every batch the engine reports how long inference took and the
+    worst capture-to-result latency in it. Both are smoothed. Going over
+    target_latency, or over the per-frame budget implied by target_fps, steps
+    down a level: first to a lower inference resolution, then to analysing
+    only every stride-th frame. Staying under headroom times the budget steps
+    back up in the reverse order. Steps are at least cooldown batches apart,
+    so the previous change has time to show.
+
+    A camera with a fall in progress always runs at the top resolution.
+    Every change is kept in self.changes and appended to audit_path as JSONL.
+    """
+
+    def __init__(self, target_latency=TARGET_LATENCY_SECONDS, target_fps=None,
+                 resolutions=RESOLUTIONS, max_stride=MAX_STRIDE, headroom=HEADROOM,
+                 cooldown=COOLDOWN_BATCHES, audit_path=None):
+        self.target_latency = target_latency
+        self.frame_budget = 1.0 / target_fps if target_fps else None
+        self.resolutions = sorted(resolutions)
+        self.max_stride = max(1, max_stride)
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.audit_path = audit_path
+
+        # Levels run from 0 (top resolution, every frame) downwards
+        self.levels = ([(width, 1) for width in reversed(self.resolutions)]
+                       + [(self.resolutions[0], stride) for stride in range(2, self.max_stride + 1)])
+        self.level = 0
+        self.since_change = 0
+        self.latency = None
+        self.inference = None
+        self.fall_cameras = set()
+        self.changes = deque(maxlen=AUDIT_HISTORY)
+
+        self._level_gauge = metrics.gauge("fall_realtime_level", "Degradation level, 0 = full quality")
+        self._width_gauge = metrics.gauge("fall_realtime_process_width", "Current inference width")
+        self._update_gauges()
+
+    @property
+    def process_width(self):
+        return self.levels[self.level][0]
+
+    @property
+    def stride(self):
+        return self.levels[self.level][1]
+
+    def width_for(self, fall_active):
+        return self.resolutions[-1] if fall_active else self.process_width
+
+    def should_analyse(self, frames_since_last, fall_active):
+        return fall_active or frames_since_last >= self.stride
+
+    def set_fall_active(self, camera, active):
+        """Record whether camera has a fall in progress; logs the override when it changes."""
+        if active == (camera in self.fall_cameras):
+            return
+        if active:
+            self.fall_cameras.add(camera)
+        else:
+            self.fall_cameras.discard(camera)
+        self._audit("fall_override_on" if active else "fall_override_off", camera=camera,
+                    process_width=self.resolutions[-1] if active else self.process_width)
+
+    def observe(self, inference_seconds, latency_seconds):
+        """Report one batch's inference time and its worst capture-to-result latency."""
+        self.inference = self._smooth(self.inference, inference_seconds)
+        self.latency = self._smooth(self.latency, latency_seconds)
+        self.since_change += 1
+        if self.since_change < self.cooldown:
+            return
+
+        load = self.latency / self.target_latency
+        if self.frame_budget:
+            load = max(load, self.inference / self.frame_budget)
+
+        if load > 1.0 and self.level < len(self.levels) - 1:
+            self._change(self.level + 1, "over_budget", load)
+        elif load < self.headroom and self.level > 0:
+            self._change(self.level - 1, "under_budget", load)
+
+    def _smooth(self, current, value):
+        return value if current is None else current + SMOOTHING * (value - current)
+
+    def _change(self, level, reason, load):
+        before = self.levels[self.level]
+        self.level = level
+        self.since_change = 0
+        self._update_gauges()
+        self._audit(reason, load=round(load, 3),
+                    from_width=before[0], from_stride=before[1],
+                    process_width=self.process_width, stride=self.stride)
+
+    def _update_gauges(self):
+        self._level_gauge.set(self.level)
+        self._width_gauge.set(self.process_width)
+
+    def _audit(self, event, **fields):
+        record = dict(time=time.time(), event=event,
+                      latency_ms=None if self.latency is None else round(self.latency * 1000, 1),
+                      inference_ms=None if self.inference is None else round(self.inference * 1000, 1),
+                      **fields)
+        self.changes.append(record)
+        if self.audit_path:
+            with open(self.audit_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "process_width": self.process_width,
+            "stride": self.stride,
+            "latency_ms": None if self.latency is None else self.latency * 1000,
+            "inference_ms": None if self.inference is None else self.inference * 1000,
+            "changes": len(self.changes),
+        }
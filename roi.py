@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+
+from detection import CONF
+from motion import MOTION_AREA, PIXEL_THRESHOLD, small_gray
+
+ROI_MARGIN = 0.5
+RESCAN_EVERY = 10
+MIN_CONFIDENCE = 0.5
+MIN_CROP_FRACTION = 0.25
+MAX_CROP_AREA = 0.6
+IMGSZ_STRIDE = 32
+
+
+def crop_imgsz(crops, limit):
+    """Model input size for a batch of crops: the largest side, rounded up to the stride."""
+    side = max(max(crop.shape[:2]) for crop in crops)
+    side = -(-side // IMGSZ_STRIDE) * IMGSZ_STRIDE
+    return min(side, -(-limit // IMGSZ_STRIDE) * IMGSZ_STRIDE)
+
+
+class RoiPlanner:
+    """Picks a crop around the people being tracked, or the full frame, for each analysed frame.
+
+    After a confident detection, inference runs on the union of the confident
+    boxes, expanded by margin times its larger side. The full frame is
+    scanned again every rescan_every analysed frames, whenever motion shows up
+    outside the crop, and as soon as nobody is found in the crop, so people
+    entering the scene are still picked up. Crops covering more than
+    max_crop_area of the frame are not worth it and fall back to the full frame.
+    """
+
+    def __init__(self, width, height, margin=ROI_MARGIN, rescan_every=RESCAN_EVERY,
+                 min_confidence=MIN_CONFIDENCE, max_crop_area=MAX_CROP_AREA,
+                 pixel_threshold=PIXEL_THRESHOLD, motion_area=MOTION_AREA):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.rescan_every = max(1, rescan_every)
+        self.min_confidence = min_confidence
+        self.max_crop_area = max_crop_area
+        self.pixel_threshold = pixel_threshold
+        self.motion_area = motion_area
+        self.min_side = int(min(width, height) * MIN_CROP_FRACTION)
+
+        self.region = None
+        self.since_full = 0
+        self.reference = None
+
+        self.full_scans = 0
+        self.crop_scans = 0
+        self.motion_rescans = 0
+        self.pixels = 0
+
+    def _motion_outside(self, gray, region):
+        if self.reference is None or self.reference.shape != gray.shape:
+            return True
+        changed = cv2.absdiff(gray, self.reference) > self.pixel_threshold
+        sx, sy = gray.shape[1] / self.width, gray.shape[0] / self.height
+        x1, y1, x2, y2 = region
+        changed[int(y1 * sy):int(np.ceil(y2 * sy)), int(x1 * sx):int(np.ceil(x2 * sx))] = False
+        return np.count_nonzero(changed) > self.motion_area * changed.size
+
+    def plan(self, frame):
+        """Return the (x1, y1, x2, y2) crop to analyse in frame, or None for the full frame."""
+        region = self.region
+        gray = small_gray(frame)
+        if region is not None and self.since_full + 1 >= self.rescan_every:
+            region = None
+        elif region is not None and self._motion_outside(gray, region):
+            self.motion_rescans += 1
+            region = None
+        self.reference = gray
+
+        if region is None:
+            self.since_full = 0
+            self.full_scans += 1
+            self.pixels += self.width * self.height
+        else:
+            self.since_full += 1
+            self.crop_scans += 1
+            self.pixels += (region[2] - region[0]) * (region[3] - region[1])
+        return region
+
+    def observe(self, detections):
+        """Update the crop from an analysed frame's full-frame detections."""
+        confident = detections[detections[:, CONF] >= self.min_confidence]
+        if len(confident) == 0:
+            self.region = None
+            return
+
+        x1, y1 = confident[:, 0].min(), confident[:, 1].min()
+        x2, y2 = confident[:, 2].max(), confident[:, 3].max()
+        pad = self.margin * max(x2 - x1, y2 - y1)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w = max(x2 - x1 + 2 * pad, self.min_side) / 2
+        half_h = max(y2 - y1 + 2 * pad, self.min_side) / 2
+        region = (max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+                  min(self.width, int(np.ceil(cx + half_w))), min(self.height, int(np.ceil(cy + half_h))))
+
+        area = (region[2] - region[0]) * (region[3] - region[1])
+        self.region = None if area > self.max_crop_area * self.width * self.height else region
+
+    def stats(self):
+        scans = self.full_scans + self.crop_scans
+        return {
+            "full_scans": self.full_scans,
+            "crop_scans": self.crop_scans,
+            "motion_rescans": self.motion_rescans,
+            "mean_frame_fraction": self.pixels / (scans * self.width * self.height) if scans else None,
+        }
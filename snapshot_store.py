@@ -0,0 +1,119 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+SNAPSHOT_DIR = os.environ.get("FALL_SNAPSHOT_DIR", "snapshots")
+JPEG_QUALITY = 95
+THUMBNAIL_WIDTH = 400
+THUMBNAIL_QUALITY = 80
+DECODE_CACHE_SIZE = 64
+
+
+class SnapshotStore:
+    """Content-addressed JPEG store with pre-generated thumbnails.
+
+    A snapshot is written once to <root>/<key[:2]>/<key>.jpg, where key is the
+    SHA-256 of the JPEG bytes, next to a small <key>.thumb.jpg for list views.
+    Decoded images are kept in an LRU cache so dashboard reruns do not decode
+    the same JPEG again.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, cache_size=DECODE_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key, thumbnail=False):
+        suffix = ".thumb.jpg" if thumbnail else ".jpg"
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def _write(self, path, data):
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_thumbnail(self, key, frame):
+        height, width = frame.shape[:2]
+        if width > THUMBNAIL_WIDTH:
+            frame = cv2.resize(frame, (THUMBNAIL_WIDTH, int(height * THUMBNAIL_WIDTH / width)),
+                               interpolation=cv2.INTER_AREA)
+        success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+        if success:
+            self._write(self.path(key, thumbnail=True), buffer.tobytes())
+
+    def put_frame(self, frame, quality=JPEG_QUALITY):
+        """Encode frame once at full size and as a thumbnail; returns the key, or None."""
+        success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            return None
+        jpeg = buffer.tobytes()
+        key = hashlib.sha256(jpeg).hexdigest()
+        self._write(self.path(key), jpeg)
+        self._write_thumbnail(key, frame)
+        return key
+
+    def put_jpeg(self, jpeg):
+        """Store already-encoded JPEG bytes; the thumbnail is generated from them."""
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        key = hashlib.sha256(jpeg).hexdigest()
+        self._write(self.path(key), jpeg)
+        self._write_thumbnail(key, frame)
+        return key
+
+    def read(self, key, thumbnail=False):
+        path = self.path(key, thumbnail)
+        if thumbnail and not os.path.exists(path):
+            path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def load_image(self, key, thumbnail=False):
+        """Decoded snapshot (read-only array) from the LRU cache, or None."""
+        cache_key = (key, thumbnail)
+        with self._lock:
+            img = self._cache.get(cache_key)
+            if img is not None:
+                self._cache.move_to_end(cache_key)
+                return img
+
+        jpeg = self.read(key, thumbnail)
+        if jpeg is None:
+            return None
+        img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        img.flags.writeable = False
+
+        with self._lock:
+            self._cache[cache_key] = img
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return img
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store
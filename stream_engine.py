@@ -0,0 +1,350 @@
+"""Live fall monitoring for several camera streams on one box.
+
+    python stream_engine.py rtsp://cam1/stream 0 hallway.mp4 --seconds 60
+
+Each source (RTSP/HTTP URL, device index, or a local file looped as a stand-in)
+has a reader thread that keeps only its newest frame. Frames that are not
+picked up in time are dropped, so latency never builds up. One inference worker
+batches the newest frame of every camera into a single model call and runs a
+FallMonitor per camera.
+"""
+import argparse
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+import metrics
+import realtime
+import roi
+from detection import detect_all_batch
+from video_processor import PROCESS_WIDTH, FallMonitor
+
+DEFAULT_FPS = 25.0
+STATS_WINDOW = 300
+RECONNECT_SECONDS = 2.0
+
+
+def _open_source(source):
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+class CameraReader:
+    def __init__(self, name, source, loop_files=True):
+        self.name = name
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.loop_files = loop_files
+
+        self.fps = DEFAULT_FPS
+        self.lock = threading.Lock()
+        self.latest = None
+        self.sequence = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"camera-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def take(self):
+        """Return (frame, capture_time, sequence) for the newest unseen frame, or None."""
+        with self.lock:
+            item, self.latest = self.latest, None
+        return item
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            cap = _open_source(self.source)
+            if not cap.isOpened():
+                self.stop_event.wait(RECONNECT_SECONDS)
+                continue
+
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            self.fps = fps if fps and 1 <= fps <= 120 else DEFAULT_FPS
+            self._read_loop(cap)
+            cap.release()
+
+            if self.is_file and not self.loop_files:
+                break
+
+    def _read_loop(self, cap):
+        # Local files are paced to their own fps so they behave like a live camera
+        frame_interval = 1.0 / self.fps
+        next_frame_at = time.monotonic()
+        while not self.stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if self.is_file and self.loop_files:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                return
+
+            now = time.monotonic()
+            self.sequence += 1
+            self.frames_read += 1
+            with self.lock:
+                if self.latest is not None:
+                    self.frames_dropped += 1
+                self.latest = (frame, now, self.sequence)
+
+            if self.is_file:
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.monotonic()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+                else:
+                    next_frame_at = time.monotonic()
+
+
+class CameraState:
+    def __init__(self, reader):
+        self.reader = reader
+        self.monitor = None
+        self.roi_planner = None
+        self.last_sequence = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.samples = deque(maxlen=STATS_WINDOW)
+        self.latency = metrics.histogram("fall_stream_latency_seconds",
+                                         "Capture to processed latency per camera", camera=reader.name)
+
+    def stats(self):
+        latencies = np.array([latency for _, latency in self.samples])
+        fps = 0.0
+        if len(self.samples) > 1:
+            span = self.samples[-1][0] - self.samples[0][0]
+            fps = (len(self.samples) - 1) / span if span > 0 else 0.0
+        return {
+            "frames_read": self.reader.frames_read,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.reader.frames_dropped,
+            "frames_skipped": self.frames_skipped,
+            "fps": fps,
+            "latency_mean_ms": float(latencies.mean() * 1000) if len(latencies) else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95) * 1000) if len(latencies) else None,
+            "latency_max_ms": float(latencies.max() * 1000) if len(latencies) else None,
+        }
+
+
+class StreamEngine:
+    """Monitor many camera sources with one shared, cross-camera batching inference worker.
+
+    sources maps a camera name to its source. on_alert(camera, alert) fires for
+    every fall alert, and on_frame(camera, annotated_frame) optionally receives
+    each processed frame. Both run on the inference thread and should be quick.
+    With roi_mode=True each camera is analysed on a crop around the people it
+    is tracking where possible (see roi.RoiPlanner). A realtime.DeadlineScheduler
+    lowers the inference width and sampling rate when the box falls behind.
+    """
+
+    def __init__(self, sources, model, on_alert=None, on_frame=None,
+                 process_width=PROCESS_WIDTH, loop_files=True, roi_mode=False, scheduler=None):
+        self.model = model
+        self.roi_mode = roi_mode
+        self.scheduler = scheduler
+        self.on_alert = on_alert
+        self.on_frame = on_frame
+        self.process_width = process_width
+        self.cameras = {name: CameraState(CameraReader(name, source, loop_files))
+                        for name, source in sources.items()}
+        self.inference_calls = 0
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name="inference", daemon=True)
+
+    def start(self):
+        for camera in self.cameras.values():
+            camera.reader.start()
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for camera in self.cameras.values():
+            camera.reader.stop()
+        self.thread.join()
+
+    def stats(self):
+        stats = {
+            "inference_calls": self.inference_calls,
+            "cameras": {name: camera.stats() for name, camera in self.cameras.items()},
+        }
+        if self.scheduler:
+            stats["scheduler"] = self.scheduler.stats()
+        return stats
+
+    def _prepare(self, camera, frame):
+        """Resize frame, or a crop of it, for the model; returns (small_frame, mapping, group).
+
+        mapping is (scale_x, scale_y, offset_x, offset_y) back to full-frame
+        coordinates. Frames with the same group, (is_crop, process_width), go
+        through the model together.
+        """
+        height, width = frame.shape[:2]
+        process_width = self.process_width
+        if self.scheduler:
+            process_width = self.scheduler.width_for(self._fall_active(camera))
+        process_width = min(process_width, width)
+        process_height = int((process_width / width) * height)
+        scale_x, scale_y = width / process_width, height / process_height
+
+        region = None
+        if self.roi_mode:
+            if camera.roi_planner is None:
+                camera.roi_planner = roi.RoiPlanner(width, height)
+            region = camera.roi_planner.plan(frame)
+        if region is None:
+            small_frame = cv2.resize(frame, (process_width, process_height))
+            return small_frame, (scale_x, scale_y, 0, 0), (False, process_width)
+
+        x1, y1, x2, y2 = region
+        size = (max(1, round((x2 - x1) / scale_x)), max(1, round((y2 - y1) / scale_y)))
+        small_frame = cv2.resize(frame[y1:y2, x1:x2], size)
+        return small_frame, ((x2 - x1) / size[0], (y2 - y1) / size[1], x1, y1), (True, process_width)
+
+    def _fall_active(self, camera):
+        return camera.monitor is not None and camera.monitor.fall_active
+
+    def _due(self, camera, sequence):
+        if not self.scheduler or not camera.last_sequence:
+            return True
+        return self.scheduler.should_analyse(sequence - camera.last_sequence, self._fall_active(camera))
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                batch = []
+                for name, camera in self.cameras.items():
+                    item = camera.reader.take()
+                    if item is None:
+                        continue
+                    if self._due(camera, item[2]):
+                        batch.append((name, camera, item))
+                    else:
+                        camera.frames_skipped += 1
+                if not batch:
+                    self.stop_event.wait(0.002)
+                    continue
+                self._process_batch(batch)
+        except BaseException as e:
+            self.errors.append(e)
+            raise
+
+    def _process_batch(self, batch):
+        prepared = [self._prepare(camera, frame) for _, camera, (frame, _, _) in batch]
+        groups = {}
+        for i, (_, _, group) in enumerate(prepared):
+            groups.setdefault(group, []).append(i)
+
+        detections = {}
+        with metrics.stage_histogram("inference").time() as timer:
+            for (is_crop, process_width), indices in groups.items():
+                small_frames = [prepared[i][0] for i in indices]
+                imgsz = None
+                if is_crop or process_width != self.process_width:
+                    imgsz = roi.crop_imgsz(small_frames, process_width)
+                detections.update(zip(indices, detect_all_batch(small_frames, self.model, imgsz=imgsz)))
+                self.inference_calls += 1
+
+        for i, (name, camera, (frame, captured_at, sequence)) in enumerate(batch):
+            if camera.monitor is None:
+                camera.monitor = FallMonitor(camera.reader.fps)
+
+            scale_x, scale_y, offset_x, offset_y = prepared[i][1]
+            dets = detections[i].copy()
+            dets[:, [0, 2]] = dets[:, [0, 2]] * scale_x + offset_x
+            dets[:, [1, 3]] = dets[:, [1, 3]] * scale_y + offset_y
+            if camera.roi_planner:
+                camera.roi_planner.observe(dets)
+            camera.monitor.update(dets)
+
+            frames_elapsed = max(1, sequence - camera.last_sequence) if camera.last_sequence else 1
+            camera.last_sequence = sequence
+            alerts = camera.monitor.step(frame, sequence, frames_elapsed)
+
+            camera.frames_processed += 1
+            done_at = time.monotonic()
+            camera.samples.append((done_at, done_at - captured_at))
+            camera.latency.observe(done_at - captured_at)
+
+            for alert in alerts:
+                if self.on_alert:
+                    self.on_alert(name, alert)
+            if self.on_frame:
+                self.on_frame(name, frame)
+            if self.scheduler:
+                self.scheduler.set_fall_active(name, camera.monitor.fall_active)
+
+        if self.scheduler:
+            worst = max(time.monotonic() - captured_at for _, _, (_, captured_at, _) in batch)
+            self.scheduler.observe(timer.elapsed, worst)
+
+
+def main():
+    import emergency
+    import model_registry
+
+    parser = argparse.ArgumentParser(description="Monitor several camera streams for falls.")
+    parser.add_argument("sources", nargs="+", help="RTSP/HTTP URLs, device indices or video files")
+    parser.add_argument("--weights", default=model_registry.DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", choices=model_registry.BACKEND_CHOICES,
+                        default=model_registry.DEFAULT_BACKEND)
+    parser.add_argument("--seconds", type=float, default=0, help="stop after this long (0 = run until Ctrl+C)")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--roi", action="store_true",
+                        help="analyse crops around tracked people, re-scanning the full frame periodically")
+    parser.add_argument("--target-latency-ms", type=float,
+                        help="adapt inference width and sampling to keep latency under this budget")
+    parser.add_argument("--target-fps", type=float, help="per-camera frame rate the budget must sustain")
+    parser.add_argument("--audit-log", default="realtime_audit.jsonl",
+                        help="where the adaptive scheduler records every change it makes")
+    args = parser.parse_args()
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    def on_alert(camera, alert):
+        # Stored and sent to family and hospitals like an uploaded video's alerts
+        emergency.raise_alert(alert, source=camera)
+        print(f"ALERT camera={camera} track={alert['track_id']} fall={alert['fall_duration']:.1f}s")
+
+    scheduler = None
+    if args.target_latency_ms:
+        scheduler = realtime.DeadlineScheduler(args.target_latency_ms / 1000, args.target_fps,
+                                               audit_path=args.audit_log)
+
+    sources = {f"cam{i}": source for i, source in enumerate(args.sources)}
+    engine = StreamEngine(sources, model_registry.get_model(args.weights, args.backend), on_alert=on_alert,
+                          roi_mode=args.roi, scheduler=scheduler)
+    engine.start()
+    started = time.monotonic()
+    try:
+        while not args.seconds or time.monotonic() - started < args.seconds:
+            time.sleep(args.report_every)
+            if engine.errors:
+                break
+            for name, stats in engine.stats()["cameras"].items():
+                if stats["latency_mean_ms"] is None:
+                    print(f"{name}: waiting for frames")
+                    continue
+                print(f"{name}: {stats['fps']:.1f} fps, latency mean {stats['latency_mean_ms']:.0f} ms "
+                      f"/ p95 {stats['latency_p95_ms']:.0f} ms, dropped {stats['frames_dropped']}")
+            if scheduler:
+                print(f"scheduler: width {scheduler.process_width}, every {scheduler.stride} frame(s)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+
+
+if __name__ == "__main__":
+    main()
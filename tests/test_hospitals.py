@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import hospitals
+from hospitals import HospitalIndex, haversine_km
+
+CENTER = (28.6139, 77.2090)
+
+
+def make_hospitals(count, span, rng):
+    lat = CENTER[0] + rng.uniform(-span / 2, span / 2, count)
+    lng = CENTER[1] + rng.uniform(-span / 2, span / 2, count)
+    return [{"id": str(i), "lat": float(lat[i]), "lng": float(lng[i])} for i in range(count)]
+
+
+def brute_force(index, lat, lng, k):
+    distances = haversine_km(lat, lng, index.lat, index.lng)
+    return [index.hospitals[i]["id"] for i in np.argsort(distances)[:k]]
+
+
+@pytest.mark.parametrize("span", [0.5, 3.0, 20.0])
+@pytest.mark.parametrize("count", [1, 5, 500])
+def test_ring_search_matches_brute_force(span, count):
+    rng = np.random.default_rng(count)
+    index = HospitalIndex(make_hospitals(count, span, rng))
+    queries = zip(CENTER[0] + rng.uniform(-span, span, 50), CENTER[1] + rng.uniform(-span, span, 50))
+    for lat, lng in queries:
+        found = index.nearest(lat, lng, k=3)
+        assert [hospital["id"] for hospital, _ in found] == brute_force(index, lat, lng, 3)
+        distances = [distance for _, distance in found]
+        assert distances == sorted(distances)
+
+
+def test_wide_spread_uses_rings_not_brute_force(monkeypatch):
+    rng = np.random.default_rng(0)
+    index = HospitalIndex(make_hospitals(2000, 20.0, rng))
+    calls = []
+    real = hospitals.haversine_km
+
+    def counting_haversine(lat, lng, lats, lngs):
+        calls.append(np.size(lats))
+        return real(lat, lng, lats, lngs)
+
+    monkeypatch.setattr(hospitals, "haversine_km", counting_haversine)
+    index.nearest(*CENTER, k=3)
+    assert sum(calls) < len(index)
+
+
+def test_query_far_outside_the_data():
+    rng = np.random.default_rng(1)
+    index = HospitalIndex(make_hospitals(100, 1.0, rng))
+    found = index.nearest(-33.9, 151.2, k=2)
+    assert [hospital["id"] for hospital, _ in found] == brute_force(index, -33.9, 151.2, 2)
+
+
+def test_k_larger_than_the_index_and_empty_index():
+    index = HospitalIndex(hospitals.DEFAULT_HOSPITALS)
+    assert len(index.nearest(*CENTER, k=10)) == len(hospitals.DEFAULT_HOSPITALS)
+    assert HospitalIndex([]).nearest(*CENTER) == []
@@ -0,0 +1,113 @@
+import pytest
+
+import notify
+from notify import AlertDispatcher, DeliveryError, MockWebhookServer
+
+RECIPIENT = {"id": "family", "channel": "fake", "address": "family@example.com"}
+
+
+class FakeChannel:
+    """Fails the first fail_first sends, then records every delivered key."""
+
+    def __init__(self, fail_first=0, retryable=True):
+        self.fail_first = fail_first
+        self.retryable = retryable
+        self.attempts = 0
+        self.delivered = []
+
+    async def send(self, address, payload, key):
+        self.attempts += 1
+        if self.fail_first > 0:
+            self.fail_first -= 1
+            raise DeliveryError("unavailable", retryable=self.retryable)
+        self.delivered.append((key, [alert["id"] for alert in payload["alerts"]]))
+
+
+def make_alert(alert_id):
+    return {"id": alert_id, "timestamp": "2026-01-01 00:00:00", "fall_duration": 12.0,
+            "location": {"address": "Home", "lat": 0.0, "lng": 0.0, "phone": "-"}}
+
+
+def dispatcher(channel, **kwargs):
+    kwargs = dict({"backoff": 0.001, "batch_seconds": 0.01}, **kwargs)
+    return AlertDispatcher(channels={"fake": channel}, **kwargs)
+
+
+def test_retries_until_delivered():
+    channel = FakeChannel(fail_first=2)
+    alerts = dispatcher(channel, max_attempts=5)
+    alerts.submit(make_alert(1), [RECIPIENT])
+    alerts.drain(timeout=5)
+    stats = alerts.stats()
+    assert (channel.attempts, stats["retries"], stats["delivered"], stats["failed"]) == (3, 2, 1, 0)
+
+
+def test_gives_up_after_max_attempts_and_keeps_the_error():
+    channel = FakeChannel(fail_first=10)
+    alerts = dispatcher(channel, max_attempts=3)
+    alerts.submit(make_alert(1), [RECIPIENT])
+    alerts.drain(timeout=5)
+    stats = alerts.stats()
+    assert (channel.attempts, stats["retries"], stats["failed"]) == (3, 2, 1)
+    assert stats["last_error"]["recipient"] == "family"
+    assert stats["last_error"]["error"] == "unavailable"
+
+
+def test_non_retryable_error_is_not_retried():
+    channel = FakeChannel(fail_first=1, retryable=False)
+    alerts = dispatcher(channel)
+    alerts.submit(make_alert(1), [RECIPIENT])
+    alerts.drain(timeout=5)
+    assert (channel.attempts, alerts.stats()["retries"], alerts.stats()["failed"]) == (1, 0, 1)
+
+
+def test_repeat_alerts_for_one_person_are_deduplicated_in_video_time():
+    channel = FakeChannel()
+    alerts = dispatcher(channel, dedupe_seconds=60)
+    assert alerts.submit(make_alert(1), [RECIPIENT], dedupe_key=("job", 1), event_time=10.0)
+    assert not alerts.submit(make_alert(2), [RECIPIENT], dedupe_key=("job", 1), event_time=40.0)
+    # Another person in the same video is a separate fall
+    assert alerts.submit(make_alert(3), [RECIPIENT], dedupe_key=("job", 2), event_time=40.0)
+    # The window does not slide with repeats, so the same person alerts again later
+    assert alerts.submit(make_alert(4), [RECIPIENT], dedupe_key=("job", 1), event_time=75.0)
+    alerts.drain(timeout=5)
+    stats = alerts.stats()
+    assert (stats["submitted"], stats["deduplicated"]) == (3, 1)
+    assert sorted(alert_id for _, ids in channel.delivered for alert_id in ids) == [1, 3, 4]
+
+
+def test_the_same_batch_is_only_delivered_once():
+    channel = FakeChannel()
+    alerts = dispatcher(channel)
+    alerts.submit(make_alert(1), [RECIPIENT])
+    alerts.drain(timeout=5)
+    alerts.submit(make_alert(1), [RECIPIENT])
+    alerts.drain(timeout=5)
+    assert len(channel.delivered) == 1
+    assert channel.delivered[0][0] == notify.idempotency_key(RECIPIENT, [make_alert(1)])
+
+
+def test_alerts_for_one_recipient_are_batched():
+    channel = FakeChannel()
+    alerts = dispatcher(channel, batch_seconds=0.2)
+    for alert_id in (1, 2, 3):
+        alerts.submit(make_alert(alert_id), [RECIPIENT])
+    alerts.drain(timeout=5)
+    assert [ids for _, ids in channel.delivered] == [[1, 2, 3]]
+
+
+@pytest.fixture
+def webhook():
+    server = MockWebhookServer(fail_first=2)
+    yield server
+    server.close()
+
+
+def test_webhook_retries_503_and_sends_an_idempotency_key(webhook):
+    alerts = AlertDispatcher(channels={"webhook": notify.WebhookChannel()}, backoff=0.001, batch_seconds=0.01)
+    recipient = {"id": "hospital", "channel": "webhook", "address": webhook.url}
+    alerts.submit(make_alert(7), [recipient])
+    alerts.drain(timeout=10)
+    assert alerts.stats()["retries"] == 2
+    assert [alert["id"] for body in webhook.requests for alert in body["alerts"]] == [7]
+    assert webhook.duplicates == 0
@@ -0,0 +1,98 @@
+import numpy as np
+
+from detection import FALL_CLASS
+from tracker import IoUTracker, greedy_match, iou_matrix
+from video_processor import FallMonitor
+
+WALKING = 1
+
+
+def box(x, y, size=100):
+    return [x, y, x + size, y + size * 2]
+
+
+def detection(x, y, cls, conf=0.9):
+    return box(x, y) + [conf, cls]
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]], rtol=1e-6)
+
+
+def test_greedy_match_is_one_to_one_highest_first():
+    score = np.array([[0.9, 0.8], [0.85, 0.1]])
+    rows, cols = greedy_match(score, score > 0.05)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (1, 1)]
+
+
+def test_ids_follow_people_as_they_move():
+    tracker = IoUTracker()
+    first = tracker.update([box(0, 0), box(500, 0)])
+    second = tracker.update([box(510, 5), box(10, 5)])
+    assert list(second) == [first[1], first[0]]
+
+
+def test_id_survives_a_short_occlusion():
+    tracker = IoUTracker(max_missed=5)
+    person = tracker.update([box(0, 0)])[0]
+    for _ in range(5):
+        tracker.update([])
+    assert tracker.update([box(5, 0)])[0] == person
+
+
+def test_id_is_dropped_after_max_missed():
+    tracker = IoUTracker(max_missed=2)
+    person = tracker.update([box(0, 0)])[0]
+    for _ in range(3):
+        tracker.update([])
+    assert tracker.update([box(0, 0)])[0] != person
+
+
+def test_centroid_fallback_keeps_id_through_fast_motion():
+    tracker = IoUTracker()
+    person = tracker.update([box(0, 0)])[0]
+    # No overlap with the previous box, but well within one box diagonal
+    assert tracker.update([box(120, 0)])[0] == person
+
+
+def run_monitor(monitor, frames):
+    alerts = []
+    for frame_count, detections in enumerate(frames):
+        monitor.update(np.array(detections, dtype=np.float32).reshape(-1, 6))
+        alerts.extend(monitor.advance(frame_count)[1])
+    return alerts
+
+
+def test_only_the_fallen_person_alerts_once():
+    monitor = FallMonitor(fps=10, alert_seconds=1)
+    frames = [[detection(0, 0, FALL_CLASS), detection(500, 0, WALKING)]] * 30
+    alerts = run_monitor(monitor, frames)
+    assert len(alerts) == 1
+    assert alerts[0]["box"] == tuple(box(0, 0))
+    assert alerts[0]["frame_index"] == 10
+
+
+def test_each_person_has_their_own_fall_timer():
+    monitor = FallMonitor(fps=10, alert_seconds=1)
+    frames = ([[detection(0, 0, FALL_CLASS), detection(500, 0, WALKING)]] * 5
+              + [[detection(0, 0, FALL_CLASS), detection(500, 0, FALL_CLASS)]] * 20)
+    alerts = run_monitor(monitor, frames)
+    assert [alert["frame_index"] for alert in alerts] == [10, 15]
+    assert len({alert["track_id"] for alert in alerts}) == 2
+
+
+def test_fall_timer_keeps_running_through_an_occlusion():
+    monitor = FallMonitor(fps=10, alert_seconds=1)
+    frames = [[detection(0, 0, FALL_CLASS)]] * 4 + [[]] * 3 + [[detection(2, 0, FALL_CLASS)]] * 10
+    alerts = run_monitor(monitor, frames)
+    assert len(alerts) == 1
+    assert alerts[0]["frame_index"] == 10
+
+
+def test_getting_up_resets_the_timer():
+    monitor = FallMonitor(fps=10, alert_seconds=1)
+    frames = ([[detection(0, 0, FALL_CLASS)]] * 8 + [[detection(0, 0, WALKING)]]
+              + [[detection(0, 0, FALL_CLASS)]] * 8)
+    assert run_monitor(monitor, frames) == []
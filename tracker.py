@@ -0,0 +1,110 @@
+import numpy as np
+
+IOU_THRESHOLD = 0.3
+MAX_CENTROID_DISTANCE = 0.75
+MAX_MISSED = 30
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes as an (N, M) array."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def _centers(boxes):
+    return (boxes[:, :2] + boxes[:, 2:4]) / 2
+
+
+def greedy_match(score, valid):
+    """Greedy one-to-one matching on an (N, M) score matrix.
+
+    Each round accepts every pair that is the best choice of both its row and
+    its column, which is what greedy highest-score-first matching picks. The
+    number of rounds is tiny in practice, and each round is fully vectorized.
+    """
+    score = np.where(valid, score, -np.inf)
+    rows_out, cols_out = [], []
+    while score.size and np.isfinite(score).any():
+        best_col = score.argmax(axis=1)
+        best_row = score.argmax(axis=0)
+        rows = np.arange(score.shape[0])
+        keep = (best_row[best_col] == rows) & np.isfinite(score[rows, best_col])
+        rows, cols = rows[keep], best_col[keep]
+        rows_out.append(rows)
+        cols_out.append(cols)
+        score[rows, :] = -np.inf
+        score[:, cols] = -np.inf
+    if not rows_out:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return np.concatenate(rows_out), np.concatenate(cols_out)
+
+
+class IoUTracker:
+    """Lightweight IoU tracker with a centroid-distance fallback.
+
+    Boxes are matched to tracks by IoU first; boxes and tracks that are still
+    unmatched are then paired by centroid distance relative to the track's box
+    diagonal, which keeps IDs through fast motion between analysed frames.
+    Tracks unmatched for more than max_missed updates are dropped.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_centroid_distance=MAX_CENTROID_DISTANCE,
+                 max_missed=MAX_MISSED):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed = max_missed
+
+        self.ids = np.zeros(0, dtype=int)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.missed = np.zeros(0, dtype=int)
+        self.next_id = 1
+
+    def update(self, boxes):
+        """Assign a track ID to each row of boxes (N, 4) and return the (N,) ID array."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        track_matched = np.zeros(len(self.ids), dtype=bool)
+        box_matched = np.zeros(len(boxes), dtype=bool)
+        box_ids = np.zeros(len(boxes), dtype=int)
+
+        if len(self.ids) and len(boxes):
+            iou = iou_matrix(self.boxes, boxes)
+            t, d = greedy_match(iou, iou >= self.iou_threshold)
+            track_matched[t] = True
+            box_matched[d] = True
+            box_ids[d] = self.ids[t]
+            self.boxes[t] = boxes[d]
+
+            diagonal = np.hypot(self.boxes[:, 2] - self.boxes[:, 0], self.boxes[:, 3] - self.boxes[:, 1])
+            distance = np.linalg.norm(_centers(self.boxes)[:, None] - _centers(boxes)[None], axis=2)
+            distance = distance / np.maximum(diagonal, 1e-6)[:, None]
+            valid = ((distance < self.max_centroid_distance)
+                     & ~track_matched[:, None] & ~box_matched[None, :])
+            t, d = greedy_match(-distance, valid)
+            track_matched[t] = True
+            box_matched[d] = True
+            box_ids[d] = self.ids[t]
+            self.boxes[t] = boxes[d]
+
+        self.missed[track_matched] = 0
+        self.missed[~track_matched] += 1
+
+        new_boxes = boxes[~box_matched]
+        new_ids = np.arange(self.next_id, self.next_id + len(new_boxes))
+        self.next_id += len(new_boxes)
+        box_ids[~box_matched] = new_ids
+
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.boxes = np.concatenate([self.boxes, new_boxes])
+        self.missed = np.concatenate([self.missed, np.zeros(len(new_ids), dtype=int)])
+
+        alive = self.missed <= self.max_missed
+        self.ids, self.boxes, self.missed = self.ids[alive], self.boxes[alive], self.missed[alive]
+        return box_ids
@@ -0,0 +1,618 @@
+import json
+import time
+
+import cv2
+import numpy as np
+
+import clips
+import metrics
+import motion
+import pipeline
+import roi
+from detection import CLASSES, CLS, CONF, FALL_CLASS, detect_all_batch
+from tracker import IoUTracker
+
+PROCESS_WIDTH = 640
+SKIP_FRAMES = 2
+BATCH_SIZE = 4
+ALERT_SECONDS = 10
+CONFIDENCE_THRESHOLD = 0.5
+CONFIDENCE_DECAY = 0.9
+
+
+class TrackState:
+    """Fall timer for one tracked person."""
+
+    def __init__(self):
+        self.fall_start_time = None
+        self.fall_frame_count = 0
+        self.alert_triggered = False
+        self.last_detection = None
+        self.detection_confidence = 0
+
+    def observe(self, row):
+        x1, y1, x2, y2 = map(int, row[:4])
+        self.last_detection = (int(row[CLS]), float(row[CONF]), x1, y1, x2, y2)
+        self.detection_confidence = float(row[CONF])
+
+    def miss(self, confidence_decay, confidence_threshold):
+        self.detection_confidence *= confidence_decay
+        if self.detection_confidence < confidence_threshold:
+            self.last_detection = None
+
+    def advance(self, frame_count, fps, alert_seconds, confidence_threshold, frames_elapsed=1):
+        """Advance the timer by frames_elapsed source frames (one, unless frames were dropped).
+
+        Returns (state, elapsed_seconds), or None while the track is hidden.
+        """
+        if not (self.last_detection and self.detection_confidence > confidence_threshold):
+            return None
+
+        if self.last_detection[0] != FALL_CLASS:
+            self.fall_start_time = None
+            self.fall_frame_count = 0
+            self.alert_triggered = False
+            return "normal", None
+
+        if self.fall_start_time is None:
+            self.fall_start_time = frame_count / fps
+            self.fall_frame_count = 0
+            return "fall_start", 0.0
+
+        self.fall_frame_count += frames_elapsed
+        elapsed_seconds = self.fall_frame_count / fps
+        if elapsed_seconds >= alert_seconds and not self.alert_triggered:
+            self.alert_triggered = True
+            return "alert", elapsed_seconds
+        if elapsed_seconds >= alert_seconds:
+            return "active", elapsed_seconds
+        return "countdown", elapsed_seconds
+
+
+def alert_snapshot(frame, box):
+    snapshot_frame = frame.copy()
+    x1, y1, x2, y2 = box
+    cv2.rectangle(snapshot_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
+    cv2.putText(snapshot_frame, "FALL DETECTED!", (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+    return snapshot_frame
+
+
+class FallMonitor:
+    """Per-person fall timers and frame annotation, advanced once per video frame."""
+
+    def __init__(self, fps, alert_seconds=ALERT_SECONDS,
+                 confidence_threshold=CONFIDENCE_THRESHOLD, confidence_decay=CONFIDENCE_DECAY,
+                 tracker=None):
+        self.fps = fps
+        self.alert_seconds = alert_seconds
+        self.confidence_threshold = confidence_threshold
+        self.confidence_decay = confidence_decay
+        self.tracker = tracker or IoUTracker()
+        self.tracks = {}
+        self.last_states = []
+
+    @property
+    def fall_active(self):
+        return any(track.fall_start_time is not None for track in self.tracks.values())
+
+    def update(self, detections):
+        """Feed one analysed frame's (N, 6) detections in full-frame coordinates.
+
+        Returns the track id assigned to each detection row.
+        """
+        track_ids = self.tracker.update(detections[:, :4]).tolist()
+        for track_id, row in zip(track_ids, detections):
+            self.tracks.setdefault(track_id, TrackState()).observe(row)
+
+        seen = set(track_ids)
+        live = set(self.tracker.ids.tolist())
+        for track_id in list(self.tracks):
+            if track_id not in live:
+                del self.tracks[track_id]
+            elif track_id not in seen:
+                self.tracks[track_id].miss(self.confidence_decay, self.confidence_threshold)
+        return track_ids
+
+    def advance(self, frame_count, frames_elapsed=1):
+        """Advance every track's timer by one frame without touching any image.
+
+        Live sources that drop stale frames pass the number of source frames
+        since the previous call as frames_elapsed, so the timer keeps real time.
+
+        Returns (states, alerts); the alerts have no snapshot.
+        """
+        states = []
+        for track_id, track in self.tracks.items():
+            status = track.advance(frame_count, self.fps, self.alert_seconds,
+                                   self.confidence_threshold, frames_elapsed)
+            if status is not None:
+                states.append((track_id, track.last_detection, *status))
+        self.last_states = states
+
+        alerts = []
+        for track_id, (cls_id, conf, x1, y1, x2, y2), state, elapsed_seconds in states:
+            if state == "alert":
+                alerts.append({
+                    "frame_index": frame_count,
+                    "track_id": track_id,
+                    "fall_duration": elapsed_seconds,
+                    "box": (x1, y1, x2, y2),
+                })
+        return states, alerts
+
+    def step(self, frame, frame_count, frames_elapsed=1):
+        """Advance every track by one frame and draw on frame in place.
+
+        Returns the list of alerts that fire on this frame.
+        """
+        states, alerts = self.advance(frame_count, frames_elapsed)
+        for alert in alerts:
+            alert["snapshot"] = alert_snapshot(frame, alert["box"])
+
+        for track_id, (cls_id, conf, x1, y1, x2, y2), state, elapsed_seconds in states:
+            label = f"{CLASSES[cls_id]} #{track_id}"
+            if state == "normal":
+                # GREEN bbox for Walking/Sitting
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(frame, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            elif state in ("alert", "active"):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)  # RED
+                cv2.putText(frame, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            elif state == "countdown":
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 3)  # YELLOW
+                cv2.putText(frame, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+        self._draw_banner(frame, states, alerts)
+        return alerts
+
+    def _draw_banner(self, frame, states, alerts):
+        falls = [(state, elapsed) for _, _, state, elapsed in states
+                 if state in ("alert", "active", "countdown")]
+        if not falls:
+            return
+
+        active = [elapsed for state, elapsed in falls if state in ("alert", "active")]
+        if alerts:
+            text, scale, color = "EMERGENCY ALERT SENT!", 0.8, (0, 0, 255)
+        elif active:
+            text, scale, color = f"ALERT ACTIVE - Fall: {int(max(active))}s", 0.8, (0, 0, 255)
+        else:
+            remaining = int(self.alert_seconds - max(elapsed for _, elapsed in falls))
+            text, scale, color = f"Fall detected, alert in {remaining}s", 0.7, (0, 255, 255)
+        if len(falls) > 1:
+            text += f" ({len(falls)} people down)"
+        cv2.putText(frame, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2)
+
+
+class DetectionTimeline:
+    """Every detection of a run as flat columns, one row per detection."""
+
+    def __init__(self):
+        self.analysed = []
+        self.frames = []
+        self.rows = []
+        self.track_ids = []
+
+    def add(self, frame_index, detections, track_ids):
+        self.analysed.append(frame_index)
+        self.frames.append(np.full(len(detections), frame_index, dtype=np.int32))
+        self.rows.append(detections)
+        self.track_ids.append(np.asarray(track_ids, dtype=np.int32))
+
+    def as_arrays(self):
+        rows = np.concatenate(self.rows) if self.rows else np.zeros((0, 6), dtype=np.float32)
+        return {
+            "analysed_frames": np.array(self.analysed, dtype=np.int32),
+            "frame_index": np.concatenate(self.frames) if self.frames else np.zeros(0, dtype=np.int32),
+            "cls": rows[:, CLS].astype(np.int16),
+            "conf": rows[:, CONF].astype(np.float32),
+            "box": rows[:, :4].astype(np.float32),
+            "track_id": (np.concatenate(self.track_ids) if self.track_ids
+                         else np.zeros(0, dtype=np.int32)),
+        }
+
+
+class BatchedDetector:
+    """Buffers frames in order and runs the model on every skip_frames-th one in batches.
+
+    Frames are picked every skip_frames, or by scheduler.should_analyse(frame)
+    when a motion.MotionScheduler is given. push() and flush() hand frames back in their original order as
+    (frame_count, frame, detections) where detections is None for frames that
+    were not analysed, and otherwise an (N, 6) array scaled to full-frame
+    coordinates.
+
+    With a roi.RoiPlanner, analysed frames may be cropped around the people
+    being tracked before resizing. Crops keep the full frame's scale and go
+    through the model in their own, smaller call.
+    """
+
+    def __init__(self, model, width, height, skip_frames=SKIP_FRAMES, batch_size=BATCH_SIZE,
+                 process_width=PROCESS_WIDTH, scheduler=None, roi_planner=None,
+                 confidence_threshold=CONFIDENCE_THRESHOLD):
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self.skip_frames = skip_frames
+        self.scheduler = scheduler
+        self.roi_planner = roi_planner
+        self.batch_size = max(1, batch_size)
+
+        self.process_width = min(process_width, width)
+        self.process_height = int((self.process_width / width) * height)
+        self.scale_x = width / self.process_width
+        self.scale_y = height / self.process_height
+
+        self.pending = []
+        self.batch_frames = 0
+        self.inference_calls = 0
+        self.frames_analysed = 0
+        self.timings = {"motion": 0.0, "resize": 0.0, "inference": 0.0}
+        self._histograms = {stage: metrics.stage_histogram(stage) for stage in self.timings}
+        self._model_calls = metrics.counter("fall_model_calls_total", "Batched model forward passes")
+        self._analysed = metrics.counter("fall_frames_analysed_total", "Frames sent to the model")
+        self._skipped = metrics.counter("fall_frames_skipped_total", "Frames not sent to the model")
+
+    def _record(self, stage, seconds):
+        self.timings[stage] += seconds
+        self._histograms[stage].observe(seconds)
+
+    def push(self, frame_count, frame):
+        small_frame = None
+        if self.scheduler:
+            start = time.perf_counter()
+            analyse = self.scheduler.should_analyse(frame)
+            self._record("motion", time.perf_counter() - start)
+        else:
+            analyse = frame_count % self.skip_frames == 0
+        region = None
+        if analyse:
+            start = time.perf_counter()
+            if self.roi_planner:
+                region = self.roi_planner.plan(frame)
+            if region is None:
+                small_frame = cv2.resize(frame, (self.process_width, self.process_height))
+            else:
+                x1, y1, x2, y2 = region
+                size = (max(1, round((x2 - x1) / self.scale_x)), max(1, round((y2 - y1) / self.scale_y)))
+                small_frame = cv2.resize(frame[y1:y2, x1:x2], size)
+            self._record("resize", time.perf_counter() - start)
+            self.batch_frames += 1
+        else:
+            self._skipped.inc()
+        self.pending.append((frame_count, frame, small_frame, region))
+
+        if self.batch_frames >= self.batch_size:
+            return self.flush()
+        return []
+
+    def _infer(self, indices, imgsz):
+        start = time.perf_counter()
+        small_frames = [self.pending[i][2] for i in indices]
+        detections = detect_all_batch(small_frames, self.model, imgsz=imgsz)
+        self._record("inference", time.perf_counter() - start)
+        self.inference_calls += 1
+        self.frames_analysed += len(indices)
+        self._model_calls.inc()
+        self._analysed.inc(len(indices))
+        return dict(zip(indices, detections))
+
+    def flush(self):
+        full = [i for i, item in enumerate(self.pending) if item[2] is not None and item[3] is None]
+        crops = [i for i, item in enumerate(self.pending) if item[3] is not None]
+        results = {}
+        if full:
+            # Without imgsz the model letterboxes every process_width back up to its default size
+            imgsz = roi.crop_imgsz([self.pending[i][2] for i in full],
+                                   max(self.process_width, self.process_height))
+            results.update(self._infer(full, imgsz))
+        if crops:
+            imgsz = roi.crop_imgsz([self.pending[i][2] for i in crops], self.process_width)
+            results.update(self._infer(crops, imgsz))
+
+        ready = []
+        last_detections = None
+        for i, (frame_count, frame, small_frame, region) in enumerate(self.pending):
+            detections_full = None
+            if small_frame is not None:
+                detections_full = last_detections = self._scale(results[i], small_frame, region)
+                if self.roi_planner:
+                    self.roi_planner.observe(detections_full)
+            ready.append((frame_count, frame, detections_full))
+
+        if self.scheduler and last_detections is not None:
+            falls = ((last_detections[:, CLS] == FALL_CLASS)
+                     & (last_detections[:, CONF] > self.confidence_threshold))
+            self.scheduler.observe(bool(falls.any()))
+
+        self.pending = []
+        self.batch_frames = 0
+        return ready
+
+    def _scale(self, detections, small_frame, region):
+        detections = detections.copy()
+        if region is None:
+            detections[:, [0, 2]] *= self.scale_x
+            detections[:, [1, 3]] *= self.scale_y
+        else:
+            x1, y1, x2, y2 = region
+            detections[:, [0, 2]] = detections[:, [0, 2]] * ((x2 - x1) / small_frame.shape[1]) + x1
+            detections[:, [1, 3]] = detections[:, [1, 3]] * ((y2 - y1) / small_frame.shape[0]) + y1
+        return detections
+
+
+def process_video(input_path, output_path, model, on_progress=None, on_alert=None,
+                  batch_size=BATCH_SIZE, skip_frames=SKIP_FRAMES, pipelined=True,
+                  adaptive=True, min_interval=motion.MIN_INTERVAL, max_interval=motion.MAX_INTERVAL,
+                  max_alert_delay_seconds=motion.MAX_ALERT_DELAY_SECONDS, output_mode="full",
+                  pre_seconds=clips.PRE_SECONDS, post_seconds=clips.POST_SECONDS,
+                  max_buffer_bytes=clips.MAX_BUFFER_BYTES, events_path=None,
+                  alert_seconds=ALERT_SECONDS, confidence_threshold=CONFIDENCE_THRESHOLD,
+                  confidence_decay=CONFIDENCE_DECAY, cached=None, roi_mode=False,
+                  roi_rescan_every=roi.RESCAN_EVERY):
+    """Annotate input_path into output_path and report alerts through on_alert.
+
+    output_mode "full" writes every frame to output_path. "clips" writes only
+    short clips, output_path's name plus _clipNNN, covering pre_seconds before a
+    fall through post_seconds after its alert; a ring buffer capped at
+    max_buffer_bytes holds the lead-in. "events" writes no video. The last two
+    also write fall_start, alert and clip records to events_path (by default
+    next to output_path with an .events.jsonl suffix).
+
+    stats["timeline"] holds every detection (see DetectionTimeline) for
+    detection_cache. Passing it back as cached=CachedDetections(...) replays
+    those detections instead of running the model, e.g. with new alert settings.
+
+    roi_mode=True runs most inferences on a crop around the people being
+    tracked (see roi.RoiPlanner), with a full-frame re-scan every
+    roi_rescan_every analysed frames or on motion outside the crop.
+
+    With pipelined=True decoding, inference and annotate+encode run on separate
+    threads; the output and alerts are identical to the serial loop.
+
+    With adaptive=True a motion.MotionScheduler picks the frames to analyse
+    between min_interval and max_interval instead of every skip_frames. Returns a
+    stats dict including per-stage busy/blocked seconds and the seconds spent in
+    decode, motion, resize, inference, drawing and encode, or None when the
+    video cannot be opened.
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        return None
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    events = None
+    if output_mode != "full" or events_path:
+        events_path = events_path or clips.events_path_for(output_path)
+        events = open(events_path, "w")
+
+    def log_event(record):
+        if events:
+            events.write(json.dumps(record) + "\n")
+
+    def on_clip(clip):
+        log_event(dict(clip, type="clip", start_seconds=clip["start_frame"] / fps,
+                       end_seconds=clip["end_frame"] / fps))
+
+    try:
+        sink = clips.make_sink(output_mode, output_path, fps, (width, height), pre_seconds,
+                               post_seconds, max_buffer_bytes, on_clip)
+    except Exception:
+        cap.release()
+        if events:
+            events.close()
+        raise
+
+    scheduler = None
+    if cached is not None:
+        detector = cached
+    else:
+        if adaptive:
+            scheduler = motion.MotionScheduler(fps, min_interval=min_interval, max_interval=max_interval,
+                                               max_alert_delay_seconds=max_alert_delay_seconds)
+        roi_planner = roi.RoiPlanner(width, height, rescan_every=roi_rescan_every) if roi_mode else None
+        detector = BatchedDetector(model, width, height, skip_frames=skip_frames, batch_size=batch_size,
+                                   scheduler=scheduler, roi_planner=roi_planner,
+                                   confidence_threshold=confidence_threshold)
+    monitor = FallMonitor(fps, alert_seconds, confidence_threshold, confidence_decay)
+    timeline = DetectionTimeline()
+    runner = pipeline.Pipeline() if pipelined else None
+    notify = runner.notify if runner else (lambda fn, *args: fn(*args))
+    frame_count = 0
+    alert_count = 0
+    timings = {"decode": 0.0, "drawing": 0.0, "encode": 0.0}
+    histograms = {stage: metrics.stage_histogram(stage) for stage in timings}
+    alerts_total = metrics.counter("fall_alerts_total", "Fall alerts raised")
+
+    def record(stage, seconds):
+        timings[stage] += seconds
+        histograms[stage].observe(seconds)
+
+    def read():
+        nonlocal frame_count
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        record("decode", time.perf_counter() - start)
+        if not ret:
+            return None
+        frame_count += 1
+        if on_progress and frame_count % 10 == 0:
+            notify(on_progress, frame_count, total_frames)
+        return frame_count, frame
+
+    def infer(item):
+        return detector.push(*item)
+
+    def write(item):
+        nonlocal alert_count
+        index, frame, detections = item
+        start = time.perf_counter()
+        if detections is not None:
+            timeline.add(index, detections, monitor.update(detections))
+        alerts = monitor.step(frame, index)
+        record("drawing", time.perf_counter() - start)
+        in_event = False
+        for track_id, _, state, _ in monitor.last_states:
+            if state in clips.EVENT_STATES:
+                in_event = True
+            if state == "fall_start":
+                log_event({"type": "fall_start", "frame_index": index, "time_seconds": index / fps,
+                           "track_id": track_id})
+        for alert in alerts:
+            alert_count += 1
+            alerts_total.inc()
+            log_event({"type": "alert", "frame_index": index, "time_seconds": index / fps,
+                       "track_id": alert["track_id"], "fall_duration": alert["fall_duration"],
+                       "box": [int(v) for v in alert["box"]]})
+            alert["time_seconds"] = index / fps
+            if on_alert:
+                notify(on_alert, alert)
+        start = time.perf_counter()
+        sink.write(index, frame, in_event)
+        record("encode", time.perf_counter() - start)
+
+    if on_progress:
+        on_progress(0, total_frames)
+
+    try:
+        if runner:
+            stages = runner.run(read, infer, detector.flush, write)
+        else:
+            stages = pipeline.run_serial(read, infer, detector.flush, write)
+    finally:
+        cap.release()
+        outputs = sink.close()
+        if events:
+            events.close()
+
+    stats = {
+        "frames": frame_count,
+        "fps": fps,
+        "frames_analysed": detector.frames_analysed,
+        "inference_calls": detector.inference_calls,
+        "alerts": alert_count,
+        "stages": stages,
+        "timings": dict(timings, **detector.timings),
+        "output_mode": output_mode,
+        "outputs": outputs,
+        "events_path": events_path,
+        "timeline": timeline.as_arrays(),
+    }
+    if isinstance(sink, clips.ClipSink):
+        stats["peak_buffer_bytes"] = sink.peak_buffer_bytes
+    if scheduler:
+        stats["scheduler"] = scheduler.stats(detector.frames_analysed)
+    if getattr(detector, "roi_planner", None):
+        stats["roi"] = detector.roi_planner.stats()
+    return stats
+
+
+def analyse_video(input_path, model, on_progress=None, on_alert=None,
+                  batch_size=BATCH_SIZE, skip_frames=SKIP_FRAMES, alert_seconds=ALERT_SECONDS,
+                  confidence_threshold=CONFIDENCE_THRESHOLD, confidence_decay=CONFIDENCE_DECAY,
+                  process_width=PROCESS_WIDTH):
+    """Analysis-only pass for bulk screening: no drawing and no video output.
+
+    Frames that are not analysed are only grab()bed, never decoded. Alerts
+    match process_video(..., adaptive=False) with the same skip_frames. The
+    snapshot passed to on_alert is the last analysed frame with the box
+    drawn on it. Returns a stats dict with "alert_events" and a "timeline"
+    of DetectionTimeline arrays, or None when the video cannot be opened.
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        return None
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    detector = BatchedDetector(model, width, height, skip_frames=skip_frames, batch_size=batch_size,
+                               process_width=process_width, confidence_threshold=confidence_threshold)
+    monitor = FallMonitor(fps, alert_seconds, confidence_threshold, confidence_decay)
+    timeline = DetectionTimeline()
+    alert_events = []
+    timings = {"grab": 0.0, "retrieve": 0.0, "tracking": 0.0}
+    alerts_total = metrics.counter("fall_alerts_total", "Fall alerts raised")
+    last_frame = None
+
+    def consume(ready):
+        nonlocal last_frame
+        start = time.perf_counter()
+        for index, frame, detections in ready:
+            if detections is not None:
+                last_frame = frame
+                timeline.add(index, detections, monitor.update(detections))
+            _, alerts = monitor.advance(index)
+            for alert in alerts:
+                alert["time_seconds"] = index / fps
+                alert_events.append(alert)
+                alerts_total.inc()
+                if on_alert:
+                    on_alert(dict(alert, snapshot=alert_snapshot(last_frame, alert["box"])))
+        timings["tracking"] += time.perf_counter() - start
+
+    if on_progress:
+        on_progress(0, total_frames)
+
+    frame_count = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            ok = cap.grab()
+            timings["grab"] += time.perf_counter() - start
+            if not ok:
+                break
+            frame_count += 1
+
+            frame = None
+            if frame_count % skip_frames == 0:
+                start = time.perf_counter()
+                ok, frame = cap.retrieve()
+                timings["retrieve"] += time.perf_counter() - start
+                if not ok:
+                    break
+            consume(detector.push(frame_count, frame))
+            if on_progress and frame_count % 10 == 0:
+                on_progress(frame_count, total_frames)
+        consume(detector.flush())
+    finally:
+        cap.release()
+
+    return {
+        "frames": frame_count,
+        "fps": fps,
+        "frames_analysed": detector.frames_analysed,
+        "inference_calls": detector.inference_calls,
+        "alerts": len(alert_events),
+        "alert_events": alert_events,
+        "timeline": timeline.as_arrays(),
+        "timings": dict(timings, **detector.timings),
+    }
+
+
+def replay_alerts(cached, fps, frames, alert_seconds=ALERT_SECONDS,
+                  confidence_threshold=CONFIDENCE_THRESHOLD, confidence_decay=CONFIDENCE_DECAY):
+    """Re-run only the fall state machine over cached detections; no video is read.
+
+    cached is a detection_cache.CachedDetections, frames the video's frame
+    count. Returns the alert events process_video would raise with these settings.
+    """
+    monitor = FallMonitor(fps, alert_seconds, confidence_threshold, confidence_decay)
+    alert_events = []
+    for index in range(1, frames + 1):
+        detections = cached.get(index)
+        if detections is not None:
+            monitor.update(detections)
+        _, alerts = monitor.advance(index)
+        for alert in alerts:
+            alert["time_seconds"] = index / fps
+            alert_events.append(alert)
+    return alert_events